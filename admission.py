@@ -0,0 +1,237 @@
+"""
+Admission control for the expensive endpoints: per-gate concurrency limits
+with a bounded, deadline-limited wait queue, per-client token buckets, fast
+429 / 503 answers with Retry-After, and the counters behind /metrics.
+State is per worker process (gunicorn threads share it, see gunicorn.conf.py).
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from flask import Blueprint, current_app, jsonify, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.wsgi import ClosingIterator
+import math, os, re, threading, time
+
+admission_bp = Blueprint("admission", __name__)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Gates. concurrency: requests served at once; queue: requests allowed to wait
+# for a slot; wait: seconds one may wait before a 503; rate / burst: token
+# bucket per client (requests per second, bucket size). Any field can be set
+# from the environment as ADMISSION_<GATE>_<FIELD>, e.g. ADMISSION_RENDER_CONCURRENCY=4.
+# ──────────────────────────────────────────────────────────────────────────────
+ADMISSION_GATES = {
+    "render": {"concurrency": 2,  "queue": 8,  "wait": 10.0, "rate": 0.5, "burst": 5},    # DOCX quotes
+    "jobs":   {"concurrency": 8,  "queue": 0,  "wait": 0.0,  "rate": 1.0, "burst": 10},   # queued quote jobs
+    "chat":   {"concurrency": 16, "queue": 64, "wait": 2.0,  "rate": 5.0, "burst": 20},
+    "bulk":   {"concurrency": 1,  "queue": 2,  "wait": 5.0,  "rate": 0.2, "burst": 2},    # /chat/classify
+}
+ADMISSION_BUCKETS_MAX = 20000   # clients remembered per process; least recently seen go first
+ADMISSION_SESSIONS_PER_IP = 8   # session buckets per IP and gate; further sessions share the IP's bucket
+# Proxies in front of the app that append to X-Forwarded-For (the platform
+# router of the Procfile deployment is one). remote_addr is taken that many
+# entries from the right, so a client cannot pick its own bucket by sending the
+# header; 0 (direct connections) ignores it. Set per deployment, see Procfile.
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
+
+for _gate, _cfg in ADMISSION_GATES.items():
+    for _field, _default in _cfg.items():
+        _value = os.environ.get(f"ADMISSION_{_gate.upper()}_{_field.upper()}")
+        if _value:
+            _cfg[_field] = type(_default)(_value)
+
+_gates = {
+    name: {
+        "cond": threading.Condition(),
+        "active": 0, "waiting": 0,
+        "admitted": 0, "limited": 0, "shed": 0, "timed_out": 0,
+        "wait_seconds": 0.0, "service_ewma": 0.0,
+    }
+    for name in ADMISSION_GATES
+}
+_buckets = OrderedDict()   # (gate, ip, session or None) -> [tokens, last refill]
+_session_buckets = {}      # (gate, ip) -> session buckets held in _buckets
+_buckets_lock = threading.Lock()
+
+@admission_bp.record_once
+def _trust_proxies(state):
+    # every app that rate-limits by client needs the real client address
+    if TRUSTED_PROXY_HOPS:
+        state.app.wsgi_app = ProxyFix(state.app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+def client_key():
+    """
+    (client IP, chat session token or None). The session only splits an IP's
+    limit between its users; it is chosen by the client, so it never replaces the IP.
+    """
+    data = request.get_json(silent=True) if request.is_json else None
+    session = data.get("session") if isinstance(data, dict) else None
+    if not (isinstance(session, str) and re.fullmatch(r"[A-Za-z0-9_\-]{8,64}", session)):
+        session = None
+    return request.remote_addr or "-", session
+
+def take_token(gate, client):
+    """Spends one token from the client's bucket. Returns 0, or seconds until one is available."""
+    cfg = ADMISSION_GATES[gate]
+    ip, session = client
+    key = (gate, ip, session)
+    now = time.monotonic()
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None and session is not None and \
+                _session_buckets.get((gate, ip), 0) >= ADMISSION_SESSIONS_PER_IP:
+            # rotating session tokens: new ones share the IP's own bucket
+            key = (gate, ip, None)
+            bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = [float(cfg["burst"]), now]
+            if key[2] is not None:
+                _session_buckets[(gate, ip)] = _session_buckets.get((gate, ip), 0) + 1
+            while len(_buckets) > ADMISSION_BUCKETS_MAX:
+                (old_gate, old_ip, old_session), _ = _buckets.popitem(last=False)
+                if old_session is not None:
+                    left = _session_buckets.pop((old_gate, old_ip)) - 1
+                    if left:
+                        _session_buckets[(old_gate, old_ip)] = left
+        else:
+            _buckets.move_to_end(key)
+            bucket[0] = min(cfg["burst"], bucket[0] + (now - bucket[1]) * cfg["rate"])
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0
+        return (1 - bucket[0]) / cfg["rate"]
+
+def refusal(gate, status, message, retry_after):
+    resp = jsonify({"error": message, "gate": gate})
+    resp.status_code = status
+    resp.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return resp
+
+def acquire(gate, client):
+    """A slot on the gate, or the 429 / 503 response refusing one."""
+    cfg, g = ADMISSION_GATES[gate], _gates[gate]
+    wait = take_token(gate, client)
+    if wait:
+        with g["cond"]:
+            g["limited"] += 1
+        return refusal(gate, 429, "too many requests", wait)
+
+    with g["cond"]:
+        if g["active"] < cfg["concurrency"]:
+            g["active"] += 1
+            g["admitted"] += 1
+            return None
+        # rough time until a slot frees up, for Retry-After
+        backlog = max(1.0, g["service_ewma"] * (g["waiting"] + 1) / cfg["concurrency"])
+        if g["waiting"] >= cfg["queue"]:
+            g["shed"] += 1
+            return refusal(gate, 503, "server busy", backlog)
+        g["waiting"] += 1
+        started = time.monotonic()
+        deadline = started + cfg["wait"]
+        try:
+            while g["active"] >= cfg["concurrency"]:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    g["timed_out"] += 1
+                    return refusal(gate, 503, "server busy", backlog)
+                g["cond"].wait(left)
+            g["active"] += 1
+            g["admitted"] += 1
+            return None
+        finally:
+            g["waiting"] -= 1
+            g["wait_seconds"] += time.monotonic() - started
+
+def release(gate, started):
+    g = _gates[gate]
+    with g["cond"]:
+        g["active"] -= 1
+        g["service_ewma"] += 0.2 * ((time.monotonic() - started) - g["service_ewma"])
+        g["cond"].notify()
+
+@contextmanager
+def admitted(gate):
+    """
+    with admitted("render") as refused:
+        if refused: return refused
+    The slot is held until the block exits.
+    """
+    refused = acquire(gate, client_key())
+    started = time.monotonic()
+    try:
+        yield refused
+    finally:
+        if refused is None:
+            release(gate, started)
+
+def admission_control(gate):
+    """
+    View decorator: admits the request through the gate or answers 429 / 503.
+    The slot is held until the response is closed, so streamed bodies count.
+    """
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            refused = acquire(gate, client_key())
+            if refused is not None:
+                return refused
+            started = time.monotonic()
+            try:
+                resp = current_app.make_response(view(*args, **kwargs))
+            except BaseException:
+                release(gate, started)
+                raise
+            released = []
+            def done():
+                if not released:
+                    released.append(True)
+                    release(gate, started)
+            if resp.direct_passthrough:
+                # send_file bodies go straight to the server, which closes the
+                # iterable but never calls the response's close hooks
+                resp.response = ClosingIterator(resp.response, done)
+            else:
+                resp.call_on_close(done)
+            return resp
+        return wrapper
+    return decorate
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Metrics (Prometheus text format; one series per gate and worker process)
+# ──────────────────────────────────────────────────────────────────────────────
+_METRICS = [
+    ("active", "gauge", "Requests being served"),
+    ("waiting", "gauge", "Requests waiting for a slot"),
+    ("admitted", "counter", "Requests admitted"),
+    ("limited", "counter", "Requests refused with 429 by the per-client rate limit"),
+    ("shed", "counter", "Requests refused with 503 because the wait queue was full"),
+    ("timed_out", "counter", "Requests refused with 503 after waiting past the deadline"),
+    ("wait_seconds", "counter", "Total seconds spent waiting for a slot"),
+    ("service_ewma", "gauge", "Moving average of seconds a slot is held"),
+]
+
+def admission_metrics():
+    lines = []
+    pid = os.getpid()
+    for name, kind, help_text in _METRICS:
+        metric = f"admission_{name}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for gate, g in _gates.items():
+            with g["cond"]:
+                value = g[name]
+            lines.append(f'{metric}{{gate="{gate}",pid="{pid}"}} {value:g}')
+    lines += ["# HELP admission_concurrency_limit Requests a gate serves at once",
+              "# TYPE admission_concurrency_limit gauge"]
+    for gate, cfg in ADMISSION_GATES.items():
+        lines.append(f'admission_concurrency_limit{{gate="{gate}",pid="{pid}"}} {cfg["concurrency"]}')
+    lines += ["# HELP admission_clients Client token buckets held", "# TYPE admission_clients gauge"]
+    with _buckets_lock:
+        lines.append(f'admission_clients{{pid="{pid}"}} {len(_buckets)}')
+    return "\n".join(lines) + "\n"
+
+@admission_bp.route("/metrics")
+def metrics():
+    return current_app.response_class(admission_metrics(), mimetype="text/plain; version=0.0.4")
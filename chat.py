@@ -0,0 +1,646 @@
+"""
+Chat engine: knowledge base, intent handlers, dialog sessions and the /chat
+endpoints (as a blueprint, so they can run in the main app or on their own
+from chat_app.py).
+"""
+from collections import OrderedDict
+from flask import Blueprint, current_app, request, stream_with_context
+import click
+import gzip, hashlib, json, os, re, sys, threading, time
+
+from pricing import (BASE_DIR, BACK_LOAD_MULT, MULT_DEN, PICKUP_ALIASES, PICKUP_LABELS, TRUCK_ALIASES,
+                     TRUCK_LABELS, cicpa_required_for, money_fils, rate_meta, rate_state, round_fils,
+                     trip_mult, trucks_allowed_for, unit_price)
+from distances import DISTANCES, distance_between, find_places, place_key
+from admission import admission_control
+from retrieval import bm25_best, build_bm25_index, tokenize
+from spelling import build_spell_index, correct_text, load_word_list
+from storage import chat_storage_quote, fill_tariffs
+
+chat_bp = Blueprint("chat", __name__)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Chat knowledge base
+# Rules, replies and normalization live in chat_knowledge.json. The file is
+# compiled once into regexes + prepared reply bodies and swapped in
+# atomically when it changes on disk (no restart needed for content edits).
+# ──────────────────────────────────────────────────────────────────────────────
+CHAT_KB_FILE = "chat_knowledge.json"
+CHAT_KB_RELOAD_SECONDS = 2.0
+
+CHAT_GZIP_MIN_BYTES = 1024   # below this gzip framing costs more than it saves
+
+def prepare_reply(text: str, compress=True):
+    """
+    Encodes a reply once into everything a response needs:
+      body: JSON bytes, etag: strong validator, gzip: compressed body or None,
+      events: the same reply as server-sent events, one per line, for /chat/stream
+    """
+    body = json.dumps({"reply": text}, ensure_ascii=False).encode("utf-8")
+    gz = None
+    if compress and len(body) >= CHAT_GZIP_MIN_BYTES:
+        gz = gzip.compress(body, compresslevel=9, mtime=0)
+    events = [
+        b"data: " + json.dumps({"text": chunk}, ensure_ascii=False).encode("utf-8") + b"\n\n"
+        for chunk in text.splitlines(keepends=True)
+    ]
+    events.append(b"event: done\ndata: {}\n\n")
+    return {
+        "body": body,
+        "gzip": gz,
+        "etag": hashlib.sha1(body).hexdigest()[:20],
+        "events": events,
+    }
+
+def reply_response(prepared):
+    """Builds a /chat response from a prepared reply without re-encoding it."""
+    headers = {"ETag": f'"{prepared["etag"]}"'}
+    body = prepared["body"]
+    if prepared["gzip"] is not None:
+        headers["Vary"] = "Accept-Encoding"
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = prepared["gzip"]
+            headers["Content-Encoding"] = "gzip"
+    return current_app.response_class(body, mimetype="application/json", headers=headers)
+
+def stream_response(prepared):
+    """Streams a prepared reply as server-sent events; the first line goes out immediately."""
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return current_app.response_class(iter(prepared["events"]), mimetype="text/event-stream", headers=headers)
+
+def _reply_text(value):
+    # multi-line replies are stored as a list of lines to keep the file editable;
+    # storage / VAS rates are referenced from the tariff tables in storage.py
+    return fill_tariffs("\n".join(value) if isinstance(value, list) else value)
+
+def chat_chamber(message, params):
+    ch_num = re.search(params["number_pattern"], message)
+    if not ch_num:
+        return None
+    chamber = int(ch_num.group(1))
+    client = params["clients"].get(str(chamber))
+    if client:
+        return params["known"].format(chamber=chamber, client=client)
+    return params["unknown"].format(chamber=chamber)
+
+def chat_pl_compare(message, params):
+    found = []
+    for code, pats in params["aliases"].items():
+        positions = [m.start() for m in (re.search(p, message) for p in pats) if m]
+        if positions:
+            found.append((code, min(positions)))
+    found.sort(key=lambda x: x[1])
+    asked = []
+    for code, _ in found:
+        if code not in asked:
+            asked.append(code)
+    if len(asked) < 2:
+        return None
+
+    lines = ["**Comparison — " + " vs ".join(asked) + "**\n"]
+    for code in asked:
+        d = params["definitions"].get(code)
+        if not d:
+            continue
+        lines.append(f"🔹 **{d['title']}**")
+        for b in d["bullets"]:
+            lines.append(f"- {b}")
+        lines.append("")
+    order = list(params["contrast"].keys())
+    ranked = sorted(asked, key=lambda k: order.index(k) if k in order else 99)
+    lines.append(f"**In short:** {' → '.join(params['contrast'][k] for k in ranked)}.")
+    return "\n".join(lines)
+
+def chat_distance(message, params):
+    ids = find_places(message)
+    if len(ids) < 2:
+        return None
+    a, b = ids[0], ids[1]
+    # two emirates on their own are enough; anything finer needs a distance word
+    emirates = DISTANCES["kinds"][a] == DISTANCES["kinds"][b] == "emirate"
+    if not emirates and not re.search(params["keywords"], message):
+        return None
+    km, time_text = distance_between(a, b)
+    return params["reply"].format(a=DISTANCES["names"][a], b=DISTANCES["names"][b], km=km, time=time_text)
+
+def _alias_rx(keys):
+    return re.compile(r"\b(" + "|".join(re.escape(k) for k in sorted(keys, key=len, reverse=True)) + r")s?\b")
+
+def build_chat_price_index(state):
+    """
+    Alias lookups for parsing "price 2 flatbed mussafah to ruwais back load"
+    with the same tables the form uses (TRUCK_ALIASES, PICKUP_ALIASES, norm_city).
+    dests maps each alias to the rate-sheet destinations it may mean.
+    """
+    trucks = {}
+    for alias, key in TRUCK_ALIASES.items():
+        trucks[place_key(alias)] = key
+    for key, label in TRUCK_LABELS.items():
+        trucks[place_key(key)] = key
+        trucks[place_key(label)] = key
+    pickups = {place_key(alias): canon for alias, canon in PICKUP_ALIASES.items()}
+
+    # rate-sheet destinations by their own name, plus any distance-matrix alias
+    # that points at a rate-sheet city (e.g. "shah" -> "Shah (Hamim)")
+    cities = {place_key(c): c for c in state["meta"]["cities_display"]}
+    dests = {k: [c] for k, c in cities.items()}
+    for alias, pid in DISTANCES["ids"].items():
+        name = place_key(DISTANCES["names"][pid])
+        if name in cities:
+            dests.setdefault(alias, [cities[name]])
+    # emirate / city names that cover rate-sheet destinations (checked against
+    # the sheet when distance_matrix.json is loaded)
+    for alias, names in DISTANCES["areas"].items():
+        dests.setdefault(alias, names)
+    return {
+        "key": state["key"],
+        "trucks": trucks, "truck_rx": _alias_rx(trucks),
+        "pickups": pickups, "pickup_rx": _alias_rx(pickups),
+        "dests": dests, "dest_rx": _alias_rx(dests),
+    }
+
+_price_index = None
+
+def chat_price_index():
+    """The price aliases for the rates in effect, rebuilt when a new rate generation is attached."""
+    global _price_index
+    state = rate_state()
+    if _price_index is None or _price_index["key"] != state["key"]:
+        _price_index = build_chat_price_index(state)
+    return _price_index
+
+def parse_price_request(message):
+    """
+    Returns {"pickups", "origin", "destinations", "trucks", "trip"} or None when
+    the message does not name at least one truck and one rate-sheet destination.
+    pickups is the list of canonical pickups to price (all three if none named)
+    and empty when the origin named is a place that is not a pickup ("origin"
+    holds its name); destinations has more than one entry when the place named
+    covers several rate-sheet destinations.
+    """
+    idx = chat_price_index()
+    text = place_key(message)
+
+    trucks = []
+    for m in idx["truck_rx"].finditer(text):
+        before = re.search(r"(\d+)\s*(?:x\s*)?$", text[:m.start()])
+        after = re.match(r"\s*x\s*(\d+)\b", text[m.end():])
+        qty = int((before or after).group(1)) if (before or after) else 1
+        trucks.append((idx["trucks"][m.group(1)], max(qty, 1)))
+    if not trucks:
+        return None
+
+    # "<pickup> to <destination>"; without "to", the first pickup name is the origin
+    to = list(re.finditer(r"\bto\b", text))
+    head, tail = (text[:to[-1].start()], text[to[-1].end():]) if to else (text, text)
+    origin = idx["pickup_rx"].search(head)
+    if not to and origin:
+        tail = text[:origin.start()] + " " * len(origin.group(0)) + text[origin.end():]
+    dest = idx["dest_rx"].search(tail)
+    if not dest:
+        return None
+
+    pickups = [idx["pickups"][origin.group(1)]] if origin else list(PICKUP_LABELS.keys())
+    origin_name = PICKUP_LABELS[pickups[0]] if origin else None
+    if to and not origin:
+        # a place before "to" that is not a pickup: say so rather than price every pickup
+        other = idx["dest_rx"].search(head)
+        places = find_places(head)
+        if other or places:
+            pickups = []
+            origin_name = DISTANCES["names"][places[0]] if places else idx["dests"][other.group(1)][0]
+    trip = "back_load" if re.search(r"\bback\s*load|\bbackhaul\b|\breturn\b", text) else "one_way"
+    return {"pickups": pickups, "origin": origin_name, "destinations": idx["dests"][dest.group(1)],
+            "trucks": trucks, "trip": trip}
+
+def chat_instant_price(message, params):
+    parsed = parse_price_request(message)
+    if not parsed:
+        return None
+    if not parsed["pickups"]:
+        return params["not_pickup"].format(origin=parsed["origin"],
+                                           pickups=", ".join(PICKUP_LABELS.values()))
+    if len(parsed["destinations"]) > 1:
+        return params["choose_destination"].format(options=", ".join(parsed["destinations"]))
+    destination, trucks, trip = parsed["destinations"][0], parsed["trucks"], parsed["trip"]
+    # a pickup is never priced to itself ("to abu dhabi airport" from AUH Airport)
+    pickups = [p for p in parsed["pickups"] if p != PICKUP_ALIASES.get(destination.lower())]
+    if not pickups:
+        return params["same_place"].format(destination=destination)
+    cicpa = " (CICPA)" if cicpa_required_for(destination) else " (Non-CICPA)"
+    trip_label = "Back Load" if trip == "back_load" else "One Way"
+    allowed = ", ".join(sorted(trucks_allowed_for(destination)))
+
+    lines = []
+    for pickup in pickups:
+        origin = PICKUP_LABELS[pickup]
+        lines.append(params["header"].format(origin=origin, destination=destination, cicpa=cicpa))
+        total, priced = 0, 0
+        for t_key, qty in trucks:
+            fields = {"truck": TRUCK_LABELS[t_key], "qty": qty, "trip": trip_label, "allowed": allowed}
+            unit, status = unit_price(origin, destination, t_key, trip)
+            if status != "ok":
+                lines.append(params[status].format(**fields))
+                continue
+            total += unit * qty
+            priced += 1
+            row = params["row_back_load"] if trip == "back_load" else params["row"]
+            lines.append(row.format(unit=money_fils(round_fils(unit)), amount=money_fils(round_fils(unit * qty)),
+                                    base=money_fils(unit // trip_mult(trip)), mult=f"{BACK_LOAD_MULT / MULT_DEN:.2f}",
+                                    **fields))
+        if priced:
+            lines.append(params["total"].format(total=money_fils(round_fils(total))))
+        lines.append("")
+    lines.append(params["footer"])
+    return "\n".join(lines)
+
+# dynamic rules reference these by name ("handler": "...") in the knowledge file
+CHAT_HANDLERS = {
+    "chamber": chat_chamber,
+    "pl_compare": chat_pl_compare,
+    "distance": chat_distance,
+    "instant_price": chat_instant_price,
+    "storage_quote": chat_storage_quote,
+}
+
+def chat_vocabulary(spec):
+    """
+    Word frequencies the typo index corrects towards: every word in the rules
+    (patterns, replies, handler params), substitution targets, the spelling
+    "words" list, and the place / truck names the pricing handlers parse.
+    """
+    texts = []
+    def walk(value):
+        if isinstance(value, str):
+            texts.append(value)
+        elif isinstance(value, list):
+            for v in value:
+                walk(v)
+        elif isinstance(value, dict):
+            for v in value.values():
+                walk(v)
+    for r in spec["rules"]:
+        walk([r.get("patterns"), r.get("keywords"), r.get("exclude"), r.get("reply"), r.get("params")])
+    walk([e["patterns"] for entries in (spec.get("dialogs") or {}).values() for e in entries])
+    walk([repl for _, repl in spec["substitutions"]])
+    walk((spec.get("spelling") or {}).get("words"))
+    walk([rate_meta()["cities_display"], list(PICKUP_LABELS.values()), list(PICKUP_ALIASES),
+          list(TRUCK_LABELS.values()), list(TRUCK_ALIASES), DISTANCES["names"], list(DISTANCES["ids"])])
+
+    counts = {}
+    for text in texts:
+        # regex escapes (\b, \s, \d ...) are not words
+        for word in re.findall(r"[a-z]+", re.sub(r"\\[a-zA-Z]", " ", text.lower())):
+            counts[word] = counts.get(word, 0) + 1
+    return counts
+
+def build_chat_retrieval(spec, rules):
+    """
+    BM25 index over the rules with a fixed reply: each document is the rule's
+    pattern words plus its optional "keywords". Reply text is left out: it
+    names things the rule does not answer ("weather", "booking" ...).
+    """
+    cfg = spec.get("retrieval") or {}
+    stopwords = frozenset(cfg.get("stopwords") or [])
+    by_id = {r["id"]: r for r in spec["rules"]}
+    docs, targets = [], []
+    for rule in rules:
+        if rule["reply"] is None:
+            continue
+        r = by_id[rule["id"]]
+        terms = re.sub(r"\\[a-zA-Z]", " ", " ".join(r["patterns"] + r.get("keywords", [])))
+        docs.append(tokenize(terms, stopwords))
+        targets.append(rule)
+    min_coverage = cfg.get("min_coverage", 0.0)
+    return {
+        "index": build_bm25_index(docs, cfg.get("k1", 1.2), cfg.get("b", 0.75)),
+        "rules": targets,
+        "stopwords": stopwords,
+        "min_score": cfg.get("min_score", 0.0),
+        "min_coverage": min_coverage,
+        "short_query": cfg.get("short_query", 0),
+        "short_min_coverage": cfg.get("short_min_coverage", min_coverage),
+    }
+
+def retrieve_rule(kb, message):
+    """The closest rule for an unmatched message, or None below the confidence thresholds."""
+    r = kb["retrieval"]
+    terms = tokenize(message, r["stopwords"])
+    best = bm25_best(r["index"], terms)
+    if best is None:
+        return None
+    doc, score, coverage = best
+    # a short query has few words to go on: most of them must match
+    min_coverage = r["short_min_coverage"] if len(set(terms)) <= r["short_query"] else r["min_coverage"]
+    if score < r["min_score"] or coverage < min_coverage:
+        return None
+    return r["rules"][doc]
+
+def compile_chat_knowledge(spec, mtime=0.0):
+    """
+    Returns a compiled knowledge base:
+      speller: typo index (spelling.py); match_chat() only uses a corrected
+               message when it matches a rule the original did not
+      subs: list of (compiled regex, replacement) applied by normalize_message()
+      rules: list of dicts with one combined regex per rule, optional exclude
+             regex, and either a prepared reply (see prepare_reply) or a handler
+      dialogs: dict[state] = [(regex, rule)] follow-ups expected after a rule
+               whose "then" put the conversation into that state
+      retrieval: BM25 fallback over the fixed-reply rules (see retrieve_rule)
+    """
+    rules = []
+    by_id = {}
+    for r in spec["rules"]:
+        if "handler" in r and r["handler"] not in CHAT_HANDLERS:
+            raise ValueError(f"unknown chat handler {r['handler']!r} in rule {r['id']!r}")
+        rule = {
+            "id": r["id"],
+            # any(re.search(p) for p in patterns) == one search over the alternation
+            "regex": re.compile("|".join(f"(?:{p})" for p in r["patterns"])),
+            "exclude": re.compile(r["exclude"]) if r.get("exclude") else None,
+            "handler": CHAT_HANDLERS.get(r.get("handler")),
+            "params": r.get("params") or {},
+            "reply": prepare_reply(_reply_text(r["reply"])) if "reply" in r else None,
+            "then": r.get("then"),
+        }
+        rules.append(rule)
+        by_id.setdefault(rule["id"], rule)
+
+    # dialog state -> the only follow-ups worth checking while in that state
+    dialogs = {}
+    for state, entries in (spec.get("dialogs") or {}).items():
+        dialogs[state] = [
+            (re.compile("|".join(f"(?:{p})" for p in e["patterns"])), by_id[e["rule"]])
+            for e in entries
+        ]
+    for rule in rules:
+        if rule["then"] and rule["then"] not in dialogs:
+            raise ValueError(f"rule {rule['id']!r} leads to unknown dialog state {rule['then']!r}")
+
+    greeting = spec["greeting"]
+    spelling = spec.get("spelling") or {}
+    english = frozenset()
+    if spelling.get("dictionary"):
+        english = load_word_list(os.path.join(BASE_DIR, spelling["dictionary"]))
+    return {
+        "version": spec.get("version", 1),
+        "mtime": mtime,
+        "speller": build_spell_index(chat_vocabulary(spec), spelling.get("min_length", 5),
+                                     spelling.get("max_distance", 2), spelling.get("long_word", 8),
+                                     english),
+        "greeting": re.compile(greeting["pattern"], re.I),
+        "greeting_max_words": greeting.get("max_words", 3),
+        "greeting_reply": by_id[greeting["rule"]]["reply"],
+        "subs": [(re.compile(p), repl) for p, repl in spec["substitutions"]],
+        "rules": rules,
+        "dialogs": dialogs,
+        "dialog_max_words": spec.get("dialog_max_words", 4),
+        "retrieval": build_chat_retrieval(spec, rules),
+        "fallback": prepare_reply(spec["fallback"]),
+    }
+
+def load_chat_knowledge():
+    path = os.path.join(BASE_DIR, CHAT_KB_FILE)
+    mtime = os.path.getmtime(path)
+    with open(path, encoding="utf-8") as f:
+        kb = compile_chat_knowledge(json.load(f), mtime)
+    print(f"[chat] loaded {len(kb['rules'])} rules, {len(kb['subs'])} substitutions, "
+          f"{len(kb['speller']['words'])} known words (v{kb['version']})")
+    return kb
+
+CHAT_KB = load_chat_knowledge()
+_chat_kb_lock = threading.Lock()
+_chat_kb_checked = time.monotonic()
+
+def current_chat_kb():
+    """Returns the live knowledge base, reloading it if the file changed on disk."""
+    global CHAT_KB, _chat_kb_checked
+    now = time.monotonic()
+    if now - _chat_kb_checked < CHAT_KB_RELOAD_SECONDS:
+        return CHAT_KB
+    # one thread checks; everyone else keeps serving the current copy
+    if not _chat_kb_lock.acquire(blocking=False):
+        return CHAT_KB
+    try:
+        _chat_kb_checked = now
+        try:
+            changed = os.path.getmtime(os.path.join(BASE_DIR, CHAT_KB_FILE)) != CHAT_KB["mtime"]
+        except OSError:
+            changed = False
+        if changed:
+            try:
+                CHAT_KB = load_chat_knowledge()
+            except Exception as e:
+                print(f"[chat] reload failed, keeping previous knowledge base: {e}")
+    finally:
+        _chat_kb_lock.release()
+    return CHAT_KB
+
+def normalize_message(kb, s: str, correct=False) -> str:
+    s = s.lower().strip()
+    if correct:
+        s = correct_text(kb["speller"], s)
+    for rx, repl in kb["subs"]:
+        s = rx.sub(repl, s)
+    return s
+
+def _answer(rule, message):
+    if rule["handler"] is None:
+        return rule["reply"]
+    reply = rule["handler"](message, rule["params"])
+    return prepare_reply(reply, compress=False) if reply is not None else None
+
+def _match_rules(kb, message, state):
+    if state in kb["dialogs"] and len(message.split()) <= kb["dialog_max_words"]:
+        for rx, rule in kb["dialogs"][state]:
+            if rx.search(message):
+                prepared = _answer(rule, message)
+                if prepared is not None:
+                    return rule["id"], prepared, rule["then"]
+
+    for rule in kb["rules"]:
+        if not rule["regex"].search(message):
+            continue
+        if rule["exclude"] is not None and rule["exclude"].search(message):
+            continue
+        prepared = _answer(rule, message)
+        if prepared is not None:
+            return rule["id"], prepared, rule["then"]
+    return None
+
+def match_chat(kb, raw: str, state=None, greet=True):
+    """
+    Returns (intent_id, prepared reply, next dialog state) for a raw chat message.
+    While a dialog state is active, short follow-ups are only checked against
+    that state's expected intents; anything else runs the full rule chain.
+    greet=False skips the short-greeting shortcut (for emails opening "Hi team,").
+    """
+    # Quick reply if first non-empty line is a short greeting
+    first_line = next((ln.strip() for ln in raw.splitlines() if ln.strip()), "")
+    if greet and kb["greeting"].match(first_line) and len(first_line.split()) <= kb["greeting_max_words"]:
+        return "greeting", kb["greeting_reply"], None
+
+    # Collapse to one line for matching
+    text = " ".join(ln.strip() for ln in raw.splitlines() if ln.strip())
+    message = normalize_message(kb, text)
+    hit = _match_rules(kb, message, state)
+    if hit is None:
+        # typo correction is only trusted when it turns the message into a rule match
+        corrected = normalize_message(kb, text, correct=True)
+        if corrected != message:
+            hit = _match_rules(kb, corrected, state)
+    if hit is not None:
+        return hit
+
+    # no pattern matched: the best-scoring answer, if it is a confident match
+    rule = retrieve_rule(kb, message)
+    if rule is not None:
+        return rule["id"], rule["reply"], rule["then"]
+    return "fallback", kb["fallback"], None
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Chat sessions: dialog state per client token (sent by chatbot.js), kept in
+# memory with a sliding TTL. Oldest entries are evicted first.
+# ──────────────────────────────────────────────────────────────────────────────
+CHAT_SESSION_TTL = 15 * 60
+CHAT_SESSION_MAX = 10000
+_chat_sessions = OrderedDict()   # token -> (state, expires_at)
+_chat_sessions_lock = threading.Lock()
+
+def _session_token(value):
+    if isinstance(value, str) and re.fullmatch(r"[A-Za-z0-9_\-]{8,64}", value):
+        return value
+    return None
+
+def session_state(token):
+    if not token:
+        return None
+    with _chat_sessions_lock:
+        entry = _chat_sessions.get(token)
+        if not entry:
+            return None
+        if entry[1] < time.monotonic():
+            del _chat_sessions[token]
+            return None
+        return entry[0]
+
+def set_session_state(token, state):
+    if not token:
+        return
+    now = time.monotonic()
+    with _chat_sessions_lock:
+        if state is None:
+            _chat_sessions.pop(token, None)
+            return
+        _chat_sessions[token] = (state, now + CHAT_SESSION_TTL)
+        _chat_sessions.move_to_end(token)
+        # entries are ordered by last update, so expired ones sit at the front
+        while _chat_sessions:
+            oldest, (_, expires) = next(iter(_chat_sessions.items()))
+            if expires >= now and len(_chat_sessions) <= CHAT_SESSION_MAX:
+                break
+            del _chat_sessions[oldest]
+
+def _chat_request_reply():
+    data = request.get_json()
+    raw = data.get("message", "") if data else ""
+    raw = raw if isinstance(raw, str) else str(raw)
+    token = _session_token(data.get("session")) if data else None
+
+    _, prepared, next_state = match_chat(current_chat_kb(), raw, session_state(token))
+    set_session_state(token, next_state)
+    return prepared
+
+@chat_bp.route("/chat", methods=["POST"])
+@admission_control("chat")
+def chat():
+    return reply_response(_chat_request_reply())
+
+@chat_bp.route("/chat/stream", methods=["POST"])
+@admission_control("chat")
+def chat_stream():
+    return stream_response(_chat_request_reply())
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Bulk classification (inbox triage): JSONL in, JSONL out, same rules as /chat
+# without sessions. Each input line is {"id": .., "message": ".."} or a bare
+# JSON string; each output line is {"id", "intent", "reply"} in input order.
+# Multi-line messages (emails) skip the greeting shortcut, so "Hi team," does
+# not hide the request below it. Replies reuse the prepared JSON body as is.
+# ──────────────────────────────────────────────────────────────────────────────
+CHAT_CLASSIFY_MAX_LINES = 100000   # per /chat/classify request; the CLI has no limit
+
+def classify_line(kb, line, n, replies=True):
+    """One JSONL input line -> one JSONL output line (bytes, newline-terminated)."""
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return json.dumps({"line": n, "error": "invalid JSON"}).encode("utf-8") + b"\n"
+    item_id, raw = (item.get("id", n), item.get("message")) if isinstance(item, dict) else (n, item)
+    if not isinstance(raw, str):
+        return json.dumps({"id": item_id, "error": "message must be a string"}).encode("utf-8") + b"\n"
+    single_line = len([ln for ln in raw.splitlines() if ln.strip()]) <= 1
+    intent, prepared, _ = match_chat(kb, raw, greet=single_line)
+    head = json.dumps({"id": item_id, "intent": intent}, ensure_ascii=False).encode("utf-8")
+    if not replies:
+        return head + b"\n"
+    # {"id": .., "intent": ..} + {"reply": ..} -> {"id": .., "intent": .., "reply": ..}
+    return head[:-1] + b", " + prepared["body"][1:] + b"\n"
+
+def classify_lines(kb, lines, replies=True, limit=None):
+    """Yields output lines for an iterable of input lines, skipping blank ones."""
+    n = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        n += 1
+        if limit is not None and n > limit:
+            yield json.dumps({"line": n, "error": f"at most {limit} lines per request"}).encode("utf-8") + b"\n"
+            return
+        yield classify_line(kb, line, n, replies)
+
+@chat_bp.route("/chat/classify", methods=["POST"])
+@admission_control("bulk")
+def chat_classify():
+    kb = current_chat_kb()
+    replies = request.args.get("replies", "1") not in ("0", "false", "no")
+    out = classify_lines(kb, request.stream, replies, CHAT_CLASSIFY_MAX_LINES)
+    return current_app.response_class(stream_with_context(out), mimetype="application/x-ndjson")
+
+_worker_kb = None
+
+def _classify_worker(args):
+    global _worker_kb
+    if _worker_kb is None:
+        _worker_kb = current_chat_kb()
+    line, n, replies = args
+    return classify_line(_worker_kb, line, n, replies)
+
+@chat_bp.cli.command("classify")
+@click.argument("infile", type=click.File("rb"), default="-")
+@click.option("-o", "--output", type=click.File("wb"), default="-", help="Output JSONL (default stdout).")
+@click.option("-w", "--workers", type=int, default=os.cpu_count() or 1, show_default=True,
+              help="Worker processes; 1 classifies in this process.")
+@click.option("--no-replies", is_flag=True, help="Only write id and intent.")
+def classify_command(infile, output, workers, no_replies):
+    """Classify JSONL messages with the chat rules: flask chat classify in.jsonl -o out.jsonl"""
+    kb = current_chat_kb()
+    replies = not no_replies
+    started, count = time.monotonic(), 0
+    if workers <= 1:
+        results = classify_lines(kb, infile, replies)
+    else:
+        import multiprocessing
+        lines = ((line, n, replies) for n, line in enumerate((ln for ln in infile if ln.strip()), 1))
+        pool = multiprocessing.get_context("fork" if sys.platform != "win32" else "spawn").Pool(workers)
+        results = pool.imap(_classify_worker, lines, chunksize=256)
+    try:
+        for out in results:
+            output.write(out)
+            count += 1
+    finally:
+        if workers > 1:
+            pool.close()
+            pool.join()
+    output.flush()
+    click.echo(f"[chat] classified {count} messages in {time.monotonic() - started:.2f}s", err=True)
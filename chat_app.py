@@ -0,0 +1,19 @@
+"""
+Chat-only WSGI app (`gunicorn chat_app:app`): serves /chat and /chat/stream
+without the quote form, rendering or stores. It never imports python-docx, and
+it reads rates from the shared rate table rather than the workbook when the
+table is up to date.
+"""
+from flask import Flask
+import os
+
+from admission import admission_bp
+from chat import chat_bp
+
+app = Flask(__name__)
+app.register_blueprint(chat_bp)
+app.register_blueprint(admission_bp)
+
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 5001))
+    app.run(host="0.0.0.0", port=port, debug=True)
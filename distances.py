@@ -0,0 +1,107 @@
+"""Distance / transit-time lookups between UAE places (distance_matrix.json)."""
+import json, math, os, re
+
+from pricing import BASE_DIR, rate_meta
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Distance / transit-time matrix (distance_matrix.json)
+# Every place has approximate coordinates; known road legs override the
+# estimate (great-circle km × road factor, time at average truck speed).
+# All pairs are computed once at startup so any lookup is one dict hit.
+# ──────────────────────────────────────────────────────────────────────────────
+DISTANCE_FILE = "distance_matrix.json"
+
+def place_key(s: str) -> str:
+    # same shape as a normalized chat message so aliases match message text
+    s = re.sub(r"[^a-z0-9\s\.]", "", (s or "").lower())
+    return re.sub(r"\s+", " ", s).strip()
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+def transit_text(minutes):
+    if minutes < 60:
+        m = max(15, int(round(minutes / 15.0)) * 15)
+        return f"{m} minutes" if m < 60 else "1 hour"
+    h = round(minutes / 30.0) / 2
+    return "1 hour" if h == 1 else f"{h:g} hours"
+
+def load_distance_matrix():
+    """
+    Returns:
+      names: list of place display names (index = place id)
+      kinds: list of place kinds (emirate / city / site / destination)
+      ids: dict[place_key(alias)] = place id
+      alias_rx: one regex over every alias, longest first
+      pairs: dict[(i, j)] = (km, time_text) for every i < j
+      speed: average truck speed in km/h (for summing transit times)
+      areas: dict[place_key(name)] = rate-sheet destinations a city / emirate
+             name covers ("dubai" -> ["Dubai - City Limits"]); more than one
+             means the caller has to ask which
+    """
+    path = os.path.join(BASE_DIR, DISTANCE_FILE)
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+
+    places = spec["places"]
+    names = [p["name"] for p in places]
+    kinds = [p.get("kind", "destination") for p in places]
+    ids = {}
+    for i, p in enumerate(places):
+        for alias in [p["name"]] + p.get("aliases", []):
+            ids.setdefault(place_key(alias), i)
+    alias_rx = re.compile(
+        r"\b(" + "|".join(re.escape(a) for a in sorted(ids, key=len, reverse=True)) + r")\b"
+    )
+
+    road_factor = spec.get("road_factor", 1.35)
+    speed = spec.get("truck_speed_kmh", 60)
+    pairs = {}
+    for i in range(len(places)):
+        for j in range(i + 1, len(places)):
+            a, b = places[i], places[j]
+            km = haversine_km(a["lat"], a["lon"], b["lat"], b["lon"]) * road_factor
+            km = max(5, int(round(km / 5.0)) * 5)
+            pairs[(i, j)] = (km, transit_text(km / speed * 60))
+    for leg in spec.get("legs", []):
+        i, j = sorted((ids[place_key(leg[0])], ids[place_key(leg[1])]))
+        km = leg[2]
+        pairs[(i, j)] = (km, leg[3] if len(leg) > 3 else transit_text(km / speed * 60))
+
+    cities = rate_meta()["cities_display"]
+    missing = [c for c in cities if place_key(c) not in ids]
+    if missing:
+        print(f"[distance] no coordinates for rate-sheet destinations: {', '.join(missing)}")
+    areas = {place_key(alias): list(dests) for alias, dests in spec.get("rate_areas", {}).items()}
+    unknown = sorted({d for dests in areas.values() for d in dests} - set(cities))
+    if unknown and cities:
+        raise ValueError(f"{DISTANCE_FILE}: rate_areas name destinations not in the rate sheet: {', '.join(unknown)}")
+    print(f"[distance] {len(names)} places, {len(pairs)} pairs")
+    return {"names": names, "kinds": kinds, "ids": ids, "alias_rx": alias_rx, "pairs": pairs, "speed": speed,
+            "areas": areas}
+
+DISTANCES = load_distance_matrix()
+
+def find_places(text: str):
+    """Place ids mentioned in text, in order of first appearance."""
+    found = []
+    for m in DISTANCES["alias_rx"].finditer(place_key(text)):
+        pid = DISTANCES["ids"][m.group(1)]
+        if pid not in found:
+            found.append(pid)
+    return found
+
+def distance_between(a, b):
+    """(km, time_text) between two place ids or names; None if unknown."""
+    if isinstance(a, str):
+        a = DISTANCES["ids"].get(place_key(a))
+    if isinstance(b, str):
+        b = DISTANCES["ids"].get(place_key(b))
+    if a is None or b is None:
+        return None
+    if a == b:
+        return (0, transit_text(0))
+    return DISTANCES["pairs"][(a, b) if a < b else (b, a)]
@@ -0,0 +1,30 @@
+# gunicorn settings (picked up automatically from the working directory)
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# Behind a proxy or platform router, TRUSTED_PROXY_HOPS must be the number of
+# proxies that append to X-Forwarded-For, or every client shares the proxy's
+# rate-limit bucket (admission.py). The Procfile sets 1 for the router.
+workers = int(os.environ.get("WEB_CONCURRENCY", "3"))
+# threaded workers, so chat keeps flowing while a worker renders a DOCX;
+# admission.py caps how many of each kind run at once per worker
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+timeout = 120
+
+# Import app.py once in the master: rates, distance matrix and chat knowledge
+# are built there and inherited by every worker.
+preload_app = True
+
+def on_starting(server):
+    # publish the rate sheet as the shared lane-rate table (pricing.py) and map
+    # it in the master, so every worker inherits the mapping
+    from pricing import init_shared_rates
+    table = init_shared_rates()
+    if table:
+        server.log.info("shared rate table generation %s", table["generation"])
+
+def when_ready(server):
+    # keep the collector from touching (and un-sharing) the preloaded objects
+    gc.freeze()
+    server.log.info("preloaded app frozen for fork")
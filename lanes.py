@@ -0,0 +1,112 @@
+"""
+Lane ranking over the rate sheet: cheapest pickup per destination, cheapest
+destinations per pickup and truck, and the price spread across pickups.
+"""
+import threading
+
+from pricing import (PICKUP_ALIASES, PICKUP_LABELS, TRUCK_BY_LABEL, TRUCK_LABELS, lane_rates, money_fils,
+                     norm_city, norm_truck, rate_state, round_fils, trip_mult)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Sorted lane views, built from the rates in effect (pricing.rate_state) and
+# rebuilt only when a new rate generation appears.
+#   by_dest[(dest, truck)]    = [(fils, pickup)] cheapest first
+#   by_pickup[(pickup, truck)] = [(fils, dest)] cheapest first
+# Only trucks allowed on a lane (CICPA vs local fleet) are ranked.
+# ──────────────────────────────────────────────────────────────────────────────
+_views = None
+_views_lock = threading.Lock()
+
+def build_lane_views(lanes, meta, key=None):
+    """lanes: [((pickup, destination), {truck: fils})], meta: see pricing.rates_meta."""
+    cicpa = meta["cicpa"]
+    allowed = {
+        True: {k for k, v in TRUCK_LABELS.items() if v in set(meta["cicpa_trucks"] or [])},
+        False: {k for k, v in TRUCK_LABELS.items() if v in set(meta["local_trucks"] or [])},
+    }
+    by_dest, by_pickup = {}, {}
+    for (pickup, dest), cell in lanes:
+        for t, fils in cell.items():
+            if t in allowed[dest in cicpa]:
+                by_dest.setdefault((dest, t), []).append((fils, pickup))
+                by_pickup.setdefault((pickup, t), []).append((fils, dest))
+    for view in (by_dest, by_pickup):
+        for rows in view.values():
+            rows.sort()
+    dest_trucks = {}
+    for dest, t in sorted(by_dest):
+        dest_trucks.setdefault(dest, []).append(t)
+    display = {norm_city(c): c for c in meta["cities_display"]}
+    return {"key": key, "by_dest": by_dest, "by_pickup": by_pickup, "dest_trucks": dest_trucks,
+            "display": display}
+
+def lane_views():
+    """The current views; rebuilt once per rate generation."""
+    global _views
+    state = rate_state()
+    if _views is not None and _views["key"] == state["key"]:
+        return _views
+    with _views_lock:
+        if _views is None or _views["key"] != state["key"]:
+            _views = build_lane_views(lane_rates(state), state["meta"], state["key"])
+            print(f"[lanes] views built: {len(_views['by_dest'])} destination/truck lists")
+    return _views
+
+def known_destination(destination):
+    """Display name of a rate-sheet destination, or None."""
+    return lane_views()["display"].get(norm_city(destination))
+
+def lane_truck(raw):
+    raw = (raw or "").strip().lower()
+    t = TRUCK_BY_LABEL.get(raw, norm_truck(raw))
+    return t if t in TRUCK_LABELS else None
+
+def lane_pickup(raw):
+    return PICKUP_ALIASES.get((raw or "").strip().lower())
+
+def _fils(fils, trip):
+    return round_fils(fils * trip_mult(trip))
+
+def _priced(fils, trip):
+    return money_fils(_fils(fils, trip))
+
+def cheapest_pickups(destination, truck=None, trip="one_way"):
+    """
+    Pickups ranked by price to a destination, per truck (every truck allowed
+    there when truck is None). Returns {truck label: [{"pickup", "price"}]}.
+    """
+    views = lane_views()
+    dest = norm_city(destination)
+    trucks = [truck] if truck else views["dest_trucks"].get(dest, [])
+    return {
+        TRUCK_LABELS[t]: [{"pickup": PICKUP_LABELS.get(p, p), "price": _priced(f, trip)}
+                          for f, p in views["by_dest"].get((dest, t), [])]
+        for t in trucks
+    }
+
+def cheapest_destinations(pickup, truck, k=10, trip="one_way", reverse=False):
+    """Top k destinations from a pickup for one truck, cheapest first (dearest with reverse)."""
+    views = lane_views()
+    rows = views["by_pickup"].get((pickup, truck), [])
+    rows = rows[-k:][::-1] if reverse else rows[:k]
+    return [{"destination": views["display"].get(d, d), "price": _priced(f, trip)} for f, d in rows]
+
+def price_spread(destination, truck=None, trip="one_way"):
+    """
+    Cheapest vs dearest pickup to a destination, per truck.
+    Returns {truck label: {"cheapest", "min", "dearest", "max", "spread", "pickups"}}.
+    """
+    views = lane_views()
+    dest = norm_city(destination)
+    out = {}
+    for t in ([truck] if truck else views["dest_trucks"].get(dest, [])):
+        rows = views["by_dest"].get((dest, t))
+        if not rows:
+            continue
+        (lo, lo_p), (hi, hi_p) = rows[0], rows[-1]
+        out[TRUCK_LABELS[t]] = {
+            "cheapest": PICKUP_LABELS.get(lo_p, lo_p), "min": _priced(lo, trip),
+            "dearest": PICKUP_LABELS.get(hi_p, hi_p), "max": _priced(hi, trip),
+            "spread": money_fils(_fils(hi, trip) - _fils(lo, trip)), "pickups": len(rows),
+        }
+    return out
@@ -0,0 +1,414 @@
+"""
+Planning over the rate sheet: the cheapest truck mix for a cargo requirement,
+load plans (units per container / truck deck) for a cargo manifest, and
+multi-drop routes (drop order plus run price).
+"""
+import math
+
+from distances import DISTANCES, distance_between, place_key, transit_text
+from pricing import (HAZMAT_TRUCKS, TRUCK_CAPACITY, TRUCK_LABELS, cicpa_required_for, money_fils,
+                     round_fils, unit_price)
+
+MIX_DIMS = ("tons", "cbm", "pallets")
+MIX_MAX_NODES = 200000   # search budget per request; the best mixes found so far are returned past it
+MIX_NEED_MAX = 10000     # largest tons / cbm / pallets one truck-mix request may ask for
+FIT_EPS = 1e-9
+
+def truck_mix_candidates(origin, destination, trip, customer="", hazmat=False):
+    """Trucks that can run the lane, as [(t_key, unit price in 1/MULT_DEN fils, capacity)]."""
+    out = []
+    for t_key in TRUCK_LABELS:
+        if hazmat and t_key not in HAZMAT_TRUCKS:
+            continue
+        unit, status = unit_price(origin, destination, t_key, trip, customer=customer)
+        if status == "ok":
+            out.append((t_key, unit, TRUCK_CAPACITY[t_key]))
+    return out
+
+def best_truck_mixes(candidates, need, top_k=3, max_nodes=MIX_MAX_NODES):
+    """
+    Branch and bound over truck counts for the top_k cheapest mixes that cover
+    every requirement in need ({"tons": .., "cbm": .., "pallets": ..}, any subset,
+    or {"manifest": 1} with manifest_candidates).
+    Mixes with a truck that could be dropped are skipped as alternatives.
+    Returns (mixes, exhaustive): mixes sorted by cost, each
+    {"trucks": [(t_key, qty)], "cost": int, "capacity": {dim: total}}.
+    """
+    dims = [d for d in need if (need.get(d) or 0) > 0]
+    if not dims or not candidates:
+        return [], True
+    # most cost-effective trucks first, so good mixes are found (and prune) early
+    cands = sorted(candidates, key=lambda c: c[1] / max(c[2][d] / need[d] for d in dims))
+    n = len(cands)
+    # cheapest cost per unit of each dimension among trucks i.. (for the lower bound)
+    tail_rate = [[math.inf] * len(dims) for _ in range(n + 1)]
+    for i in range(n - 1, -1, -1):
+        _, unit, cap = cands[i]
+        for k, d in enumerate(dims):
+            r = unit / cap[d] if cap[d] > 0 else math.inf
+            tail_rate[i][k] = min(tail_rate[i + 1][k], r)
+
+    best = []           # sorted [(cost, counts)]
+    counts = [0] * n
+    nodes = 0
+
+    def minimal(covered):
+        for i, c in enumerate(counts):
+            if c and all(covered[k] - cands[i][2][d] >= need[d] - FIT_EPS for k, d in enumerate(dims)):
+                return False
+        return True
+
+    def search(i, cost, remaining):
+        nonlocal nodes
+        nodes += 1
+        if nodes > max_nodes:
+            return
+        if all(r <= FIT_EPS for r in remaining):
+            covered = [need[d] - remaining[k] for k, d in enumerate(dims)]
+            if minimal(covered):
+                best.append((cost, counts[:]))
+                best.sort(key=lambda b: b[0])
+                del best[top_k:]
+            return
+        if i == n:
+            return
+        bound = cost + max(r * tail_rate[i][k] for k, r in enumerate(remaining) if r > FIT_EPS)
+        if bound == math.inf or (len(best) == top_k and bound >= best[-1][0]):
+            return
+        _, unit, cap = cands[i]
+        most = max((math.ceil(r / cap[d] - FIT_EPS) for r, d in zip(remaining, dims) if r > FIT_EPS and cap[d] > 0),
+                   default=0)
+        for c in range(most, -1, -1):
+            counts[i] = c
+            search(i + 1, cost + c * unit, [r - c * cap[d] for r, d in zip(remaining, dims)])
+        counts[i] = 0
+
+    search(0, 0, [need[d] for d in dims])
+
+    mixes = []
+    for cost, cnt in best:
+        used = [(cands[i], c) for i, c in enumerate(cnt) if c]
+        mixes.append({
+            "trucks": [(cand[0], c) for cand, c in used],
+            "cost": cost,
+            "capacity": {d: round(sum(cand[2][d] * c for cand, c in used), 3) for d in used[0][0][2]},
+        })
+    return mixes, nodes <= max_nodes
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Load planning: how many pallets / cartons fit per container or truck deck,
+# and how many vehicles a manifest needs. Inner dimensions in metres, payload
+# in kg. Truck decks match TRUCK_CAPACITY (e.g. 24 standard pallets on a
+# flatbed); container payloads follow the figures the chat bot quotes.
+# ──────────────────────────────────────────────────────────────────────────────
+LOAD_SPACES = {
+    "container_20ft":  {"label": "20ft Container",         "length": 5.90,  "width": 2.35, "height": 2.39, "payload_kg": 28000, "truck": None},
+    "container_40ft":  {"label": "40ft Container",         "length": 12.03, "width": 2.35, "height": 2.39, "payload_kg": 30400, "truck": None},
+    "container_40hc":  {"label": "40ft High Cube",         "length": 12.03, "width": 2.35, "height": 2.69, "payload_kg": 30400, "truck": None},
+    "3tpickup":        {"label": "3TPickup",               "length": 3.20,  "width": 2.00, "height": 1.80, "payload_kg": 3000,  "truck": "3tpickup"},
+    "7tpickup":        {"label": "7TPickup",               "length": 5.00,  "width": 2.15, "height": 2.20, "payload_kg": 7000,  "truck": "7tpickup"},
+    "flatbed":         {"label": "Flatbed",                "length": 12.20, "width": 2.45, "height": 2.60, "payload_kg": 22000, "truck": "flatbed"},
+    "hazmatfb":        {"label": "HazmatFB",               "length": 12.20, "width": 2.45, "height": 2.60, "payload_kg": 20000, "truck": "hazmatfb"},
+    "curtain trailer": {"label": "Curtain Trailer",        "length": 13.60, "width": 2.45, "height": 2.70, "payload_kg": 25000, "truck": "curtain trailer"},
+    "desert truck":    {"label": "Desert Truck",           "length": 6.20,  "width": 2.40, "height": 2.20, "payload_kg": 12000, "truck": "desert truck"},
+}
+PALLET_FOOTPRINTS = {"standard": (1.2, 1.0), "euro": (1.2, 0.8)}
+DEFAULT_PALLET_HEIGHT = 1.5
+LOAD_PLAN_DETAIL_MAX = 50   # per-line layouts are listed for manifests up to this many lines
+
+_floor_cache = {}
+
+def floor_layout(length, width, l, w):
+    """
+    Most l × w footprints on a length × width floor: straight rows either way,
+    or rows one way with the leftover strip (along the length or across the
+    width) filled the other way. Returns (count, description).
+    """
+    key = (length, width, l, w)
+    if key in _floor_cache:
+        return _floor_cache[key]
+    fit = lambda total, size: int(total / size + FIT_EPS)
+    best = (0, "does not fit")
+    for a, b, names in ((l, w, ("lengthwise", "crosswise")), (w, l, ("crosswise", "lengthwise"))):
+        across_a, across_b = fit(width, b), fit(width, a)
+        for rows in range(fit(length, a), -1, -1):
+            rest = fit(length - rows * a, b)
+            count = rows * across_a + rest * across_b
+            if count > best[0]:
+                desc = f"{rows} × {across_a} {names[0]}"
+                if rest and across_b:
+                    desc += f" + {rest} × {across_b} {names[1]}"
+                best = (count, desc)
+        along_a, along_b = fit(length, a), fit(length, b)
+        for bands in range(fit(width, b), 0, -1):
+            rest = fit(width - bands * b, a)
+            count = bands * along_a + rest * along_b
+            if count > best[0]:
+                desc = f"{along_a} × {bands} {names[0]}"
+                if rest and along_b:
+                    desc += f" + {along_b} × {rest} {names[1]}"
+                best = (count, desc)
+    _floor_cache[key] = best
+    return best
+
+def manifest_lines(manifest):
+    """
+    Normalizes a manifest into [(sku, qty, l, w, h, kg, stackable)].
+    Each entry: qty plus either pallet ("standard"/"euro") or length/width
+    (metres); height (m), weight (kg per unit) and stackable are optional.
+    Raises ValueError for unusable entries.
+    """
+    lines = []
+    for n, item in enumerate(manifest, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"line {n}: expected an object")
+        sku = str(item.get("sku") or f"line {n}")
+        qty = int(item.get("qty") or 0)
+        pallet = (item.get("pallet") or "").strip().lower()
+        if pallet:
+            if pallet not in PALLET_FOOTPRINTS:
+                raise ValueError(f"{sku}: pallet must be one of {', '.join(PALLET_FOOTPRINTS)}")
+            l, w = PALLET_FOOTPRINTS[pallet]
+            h = float(item.get("height") or DEFAULT_PALLET_HEIGHT)
+        else:
+            l, w, h = float(item.get("length") or 0), float(item.get("width") or 0), float(item.get("height") or 0)
+        kg = float(item.get("weight") or 0)
+        if qty <= 0 or min(l, w, h) <= 0 or kg < 0:
+            raise ValueError(f"{sku}: qty and dimensions must be positive")
+        lines.append((sku, qty, l, w, h, kg, bool(item.get("stackable", pallet == ""))))
+    return lines
+
+def plan_space(space, lines, detail=False):
+    """
+    Vehicles of one load space needed for the manifest lines. Lines sharing a
+    vehicle split its floor slots pro rata (a planning estimate, not a packed
+    layout), and the total weight is checked against the payload.
+    """
+    s = LOAD_SPACES[space]
+    slots = 0.0
+    weight = 0.0
+    rows, misfits = [], []
+    for sku, qty, l, w, h, kg, stackable in lines:
+        per_floor, layout = floor_layout(s["length"], s["width"], l, w)
+        layers = max(1, int(s["height"] / h + FIT_EPS)) if stackable else 1
+        if per_floor == 0 or h > s["height"] + FIT_EPS or kg > s["payload_kg"]:
+            misfits.append(sku)
+            continue
+        slots += math.ceil(qty / layers) / per_floor
+        weight += qty * kg
+        if detail:
+            per_vehicle = per_floor * layers
+            if kg:
+                per_vehicle = min(per_vehicle, int(s["payload_kg"] // kg))
+            rows.append({"sku": sku, "per_floor": per_floor, "layers": layers,
+                         "per_vehicle": per_vehicle, "layout": layout})
+    load = max(slots, weight / s["payload_kg"])
+    out = {
+        "space": space, "label": s["label"], "truck": s["truck"],
+        "fits": not misfits,
+        "vehicles": math.ceil(load - FIT_EPS) if not misfits else None,
+        "load": round(load, 4),
+        "weight_kg": round(weight, 1),
+    }
+    if misfits:
+        out["does_not_fit"] = misfits[:20]
+    if detail:
+        out["lines"] = rows
+    return out
+
+def plan_load(manifest, spaces=None):
+    """Load plan of a manifest for each load space (all of LOAD_SPACES by default)."""
+    lines = manifest_lines(manifest)
+    detail = len(lines) <= LOAD_PLAN_DETAIL_MAX
+    return [plan_space(sp, lines, detail) for sp in (spaces or LOAD_SPACES)]
+
+def manifest_candidates(candidates, manifest):
+    """
+    Turns truck_mix_candidates into candidates for best_truck_mixes with
+    need {"manifest": 1}: each truck carries 1 / (trucks of its kind needed)
+    of the manifest. Trucks the manifest does not fit on are dropped.
+    """
+    lines = manifest_lines(manifest)
+    out = []
+    for t_key, unit, _ in candidates:
+        plan = plan_space(t_key, lines)
+        if plan["fits"] and plan["load"] > 0:
+            out.append((t_key, unit, {"manifest": 1 / plan["load"]}))
+    return out
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Multi-drop routes: one pickup, several drops. Drops are ordered by nearest
+# neighbour and improved with 2-opt over the distance matrix. The rate sheet
+# only prices single lanes, so a run with one drop is priced on its lane and a
+# multi-drop run is left unpriced, with the per-drop lane rates listed for
+# whoever prepares its quotation.
+# ──────────────────────────────────────────────────────────────────────────────
+ROUTE_MAX_STOPS = 60
+ROUTE_MAX_QTY = 100      # trucks of one type per run
+
+def route_place(name):
+    """Place id for a name or alias; None if the distance matrix does not know it."""
+    return DISTANCES["ids"].get(place_key(name))
+
+def drop_destination(stop):
+    """
+    The rate-sheet destination a drop is priced to: the drop itself, or the
+    one destination its city / emirate name covers (DISTANCES["areas"], as in
+    chat pricing). None when the name covers several.
+    """
+    dests = DISTANCES["areas"].get(place_key(stop))
+    if dests is None:
+        return stop
+    return dests[0] if len(dests) == 1 else None
+
+def order_stops(km, stops, back_to_start=False):
+    """
+    Visiting order for stops (indexes into km, the square distance matrix),
+    starting at index 0 and optionally returning to it: nearest neighbour,
+    then 2-opt (segment reversal) and or-opt (moving 1–3 stops) until neither
+    shortens the route. Returns the ordered stop list (without the start).
+    """
+    left = set(stops)
+    tour, here = [], 0
+    while left:
+        here = min(left, key=lambda s: (km[here][s], s))
+        tour.append(here)
+        left.remove(here)
+
+    path = [0] + tour + ([0] if back_to_start else [])
+    last = len(path) - 1 if back_to_start else len(path)   # path[1:last] can move
+
+    def two_opt():
+        changed = False
+        for i in range(1, last - 1):
+            a, b = path[i - 1], path[i]
+            for k in range(i + 1, last):
+                c = path[k]
+                d = path[k + 1] if k + 1 < len(path) else None
+                delta = km[a][c] - km[a][b]
+                if d is not None:
+                    delta += km[b][d] - km[c][d]
+                if delta < 0:
+                    path[i:k + 1] = path[i:k + 1][::-1]
+                    b = path[i]
+                    changed = True
+        return changed
+
+    def or_opt():
+        for size in (1, 2, 3):
+            for i in range(1, last - size + 1):
+                seg = path[i:i + size]
+                prev = path[i - 1]
+                nxt = path[i + size] if i + size < len(path) else None
+                gain = km[prev][seg[0]] + (km[seg[-1]][nxt] - km[prev][nxt] if nxt is not None else 0)
+                rest = path[:i] + path[i + size:]
+                for p in range(1, len(rest) if back_to_start else len(rest) + 1):
+                    if p == i:
+                        continue
+                    u = rest[p - 1]
+                    v = rest[p] if p < len(rest) else None
+                    for s in (seg, seg[::-1]):
+                        add = km[u][s[0]] + (km[s[-1]][v] - km[u][v] if v is not None else 0)
+                        if add < gain:
+                            path[:] = rest[:p] + s + rest[p:]
+                            return True
+        return False
+
+    while two_opt() or or_opt():
+        pass
+    return path[1:last]
+
+def plan_route(origin, drops, back_to_start=False, optimize=True):
+    """
+    Drop order and legs for one pickup and several drops (place names).
+    Raises ValueError for unknown places. Returns {"stops", "legs", "round_trip",
+    "km", "minutes", "time"} with legs as [{"from", "to", "km", "time"}].
+    """
+    ids = []
+    for name in [origin] + list(drops):
+        pid = route_place(name)
+        if pid is None:
+            raise ValueError(f"unknown place {name!r}")
+        if pid not in ids:
+            ids.append(pid)
+    if len(ids) < 2:
+        raise ValueError("give at least one drop other than the pickup")
+    km = [[distance_between(a, b)[0] for b in ids] for a in ids]
+    order = list(range(1, len(ids)))
+    if optimize:
+        order = order_stops(km, order, back_to_start)
+    path = [0] + order + ([0] if back_to_start else [])
+
+    names = DISTANCES["names"]
+    legs = []
+    for a, b in zip(path, path[1:]):
+        legs.append({"from": names[ids[a]], "to": names[ids[b]], "km": km[a][b],
+                     "time": distance_between(ids[a], ids[b])[1]})
+    total_km = sum(leg["km"] for leg in legs)
+    minutes = total_km / DISTANCES["speed"] * 60
+    return {"stops": [names[ids[i]] for i in order], "legs": legs, "round_trip": back_to_start,
+            "km": total_km, "minutes": round(minutes), "time": transit_text(minutes)}
+
+def price_route(origin, route, trucks, trip="one_way", cargo_type="general", customer=""):
+    """
+    Prices a planned route (plan_route) for [(t_key, qty)] trucks.
+    Returns a quote dict shaped like pricing.price_transport_quote (so it renders
+    with quote_render) plus "drops": per-drop lane prices per truck,
+    "unpriced": drops without a rate for some truck, and "priced": whether the
+    total stands. Only a single-drop run with a rate for every truck is priced.
+    """
+    stops = route["stops"]
+    lanes_to = [drop_destination(s) for s in stops]
+    cicpa = any(d is not None and cicpa_required_for(d) for d in lanes_to)
+    cicpa_flag = " (CICPA)" if cicpa else " (Non-CICPA)"
+    path = " \u2192 ".join([origin] + stops + ([origin] if route["round_trip"] else []))
+    trip_label = "Back Load" if trip == "back_load" else "One Way"
+    multi_drop = len(stops) > 1
+
+    rows, drops, subtotal, unpriced = [], [], 0, set()
+    for t_key, qty in trucks:
+        label = TRUCK_LABELS[t_key]
+        lanes = [(s, d) + (unit_price(origin, d, t_key, trip, cargo_type, customer) if d
+                           else (None, "choose_destination"))
+                 for s, d in zip(stops, lanes_to)]
+        drops.append({"truck": label, "lanes": [
+            {"drop": s, "destination": d, "status": status,
+             "unit": money_fils(round_fils(unit)) if unit is not None else None}
+            for s, d, unit, status in lanes
+        ]})
+        blocked = [s for s, _, _, status in lanes if status == "not_available"]
+        no_rate = [s for s, _, _, status in lanes if status in ("no_rate", "choose_destination")]
+        unpriced.update(blocked + no_rate)
+        if blocked:
+            rows.append((f"{label} x {qty} — {path} (not available for {', '.join(blocked)})", "", ""))
+        elif no_rate:
+            rows.append((f"{label} x {qty} — {path} (No rate found for {', '.join(no_rate)})", "", ""))
+        elif multi_drop:
+            rows.append((f"{label} x {qty} — multi-drop run, {len(stops)} drops "
+                         "(priced on request; lane rates per drop are listed)", "", ""))
+        else:
+            _, lane, unit, _ = lanes[0]
+            rows.append((f"{label} x {qty} — {origin} \u2192 {lane}{cicpa_flag}",
+                         f"AED {money_fils(round_fils(unit))}", f"AED {money_fils(round_fils(unit * qty))}"))
+            subtotal += unit * qty
+
+    grand_total = subtotal = round_fils(subtotal)
+    return {
+        "origin": origin,
+        "destination": stops[-1],
+        "cargo_type": cargo_type,
+        "customer": customer,
+        "is_cicpa": cicpa,
+        "cicpa_flag": cicpa_flag,
+        "trip_label": trip_label,
+        "truck_summary": "; ".join(f"{TRUCK_LABELS[t]} x {q}" for t, q in trucks) or "N/A",
+        "route": path + cicpa_flag,
+        "trucks": trucks,
+        "rows": rows,
+        "subtotal": subtotal,
+        "grand_total": grand_total,
+        "drops": drops,
+        "unpriced": [s for s in stops if s in unpriced],
+        "multi_drop": multi_drop,
+        "priced": not unpriced and not multi_drop,
+    }
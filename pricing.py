@@ -0,0 +1,754 @@
+"""
+Rates and pricing: the rate sheet, customer rate cards, the shared lane-rate
+table and fixed-point money. Imports no web or document libraries, and only
+loads openpyxl when a workbook actually has to be parsed.
+"""
+from array import array
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
+import hashlib, json, mmap, os, re, struct, threading, time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INSTANCE_DIR = os.path.join(BASE_DIR, "instance")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ──────────────────────────────────────────────────────────────────────────────
+DEC = Decimal
+
+def q2d(x, default="0"):
+    try:
+        return DEC(str(x))
+    except Exception:
+        return DEC(default)
+
+def money(d):
+    if d is None:
+        return ""
+    if not isinstance(d, Decimal):
+        d = q2d(d, "0")
+    return f"{d.quantize(DEC('0.01'), rounding=ROUND_HALF_UP):,.2f}"
+
+# Fixed-point money for the pricing path: amounts are integer fils (1/100 AED)
+# and trip multipliers are integers per MULT_DEN, so rate × multiplier × qty is
+# exact in 1/MULT_DEN fils and rounded (half up, as money() does) only once.
+MULT_DEN = 100
+
+def to_fils(x):
+    """Sheet cell / user input -> integer fils, ROUND_HALF_UP (garbage -> 0, like q2d)."""
+    if isinstance(x, int):
+        return x * 100
+    if isinstance(x, float) and x.is_integer():
+        return int(x) * 100
+    return int(q2d(x).quantize(DEC("0.01"), rounding=ROUND_HALF_UP) * 100)
+
+def round_fils(v, den=MULT_DEN):
+    """v in 1/den fils -> whole fils, ROUND_HALF_UP (halves away from zero)."""
+    if v >= 0:
+        return (2 * v + den) // (2 * den)
+    return -((-2 * v + den) // (2 * den))
+
+def money_fils(f):
+    """Integer fils -> "1,234.56", the same text money() gives for the AED amount."""
+    sign = "-" if f < 0 else ""
+    f = abs(f)
+    return f"{sign}{f // 100:,}.{f % 100:02d}"
+
+def norm_city(s: str) -> str:
+    s = (s or "").strip().lower()
+    s = re.sub(r"\s+", " ", s)
+    s = s.replace("_", " ").replace("–", "-").replace("—", "-")
+    return s
+
+# canonical pickups we expose in the UI
+# ✅ FIX: show "Khalifa Port" (not "Khalifa Port/Taweelah") in the pickup list
+PICKUP_LABELS = {
+    "mussafah": "Mussafah",
+    "auh airport": "AUH Airport",
+    "khalifa port": "Khalifa Port",
+}
+
+# map any sheet variants to these allowed 3 pickups
+# (we still read "Khalifa Port/Taweelah" from the rates sheet, but it’s a DESTINATION)
+PICKUP_ALIASES = {
+    "mussafah": "mussafah",
+    "auh airport": "auh airport",
+    "abu dhabi airport": "auh airport",
+    "airport": "auh airport",
+    "khalifa port": "khalifa port",
+    "taweelah": "khalifa port",           # treat Taweelah pickup as Khalifa Port pickup
+    "kizad": "khalifa port",              # common shorthand around KP area
+    "khalifa port/taweelah": "khalifa port",
+}
+
+# Only these truck types are valid
+TRUCK_LABELS = {
+    "3tpickup": "3TPickup",
+    "7tpickup": "7TPickup",
+    "flatbed": "Flatbed",
+    "hazmatfb": "HazmatFB",
+    "curtain trailer": "Curtain Trailer",
+    "desert truck": "Desert Truck",
+}
+TRUCK_ALIASES = {
+    "3t": "3tpickup", "3 ton": "3tpickup", "3 ton pickup": "3tpickup", "3tpickup": "3tpickup",
+    "7t": "7tpickup", "7 ton": "7tpickup", "7 ton pickup": "7tpickup", "7tpickup": "7tpickup",
+    "flat bed": "flatbed", "flat-bed": "flatbed", "flatbed": "flatbed",
+    "hazmat fb": "hazmatfb", "hazmat": "hazmatfb", "dg flatbed": "hazmatfb", "hazmatfb": "hazmatfb",
+    "curtain": "curtain trailer", "curtainside": "curtain trailer", "curtain trailer": "curtain trailer",
+    "desert": "desert truck", "desert-truck": "desert truck", "desert truck": "desert truck",
+}
+
+# Planning capacity per truck (conservative: the low end of what the fleet
+# carries). pallets = standard 1.2 × 1.0 m pallets on the deck.
+TRUCK_CAPACITY = {
+    "3tpickup":        {"tons": 3,  "cbm": 12, "pallets": 4},
+    "7tpickup":        {"tons": 7,  "cbm": 30, "pallets": 8},
+    "flatbed":         {"tons": 22, "cbm": 70, "pallets": 24},
+    "hazmatfb":        {"tons": 20, "cbm": 70, "pallets": 24},
+    "curtain trailer": {"tons": 25, "cbm": 80, "pallets": 26},
+    "desert truck":    {"tons": 12, "cbm": 40, "pallets": 12},
+}
+HAZMAT_TRUCKS = {"hazmatfb"}
+
+def norm_truck(s: str) -> str:
+    key = (s or "").strip().lower()
+    if key in TRUCK_LABELS:
+        return key
+    return TRUCK_ALIASES.get(key, key)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Rates loader (matrix with merged pickup headers supported)
+# Sheets: "Local" (non-CICPA) and "CICPA"
+# Row 1 = pickup, Row 2 = truck type, Col A = city
+# ──────────────────────────────────────────────────────────────────────────────
+def load_rates_from_matrix(ws, cicpa=False):
+    """
+    Returns:
+      rates: dict[(origin_norm, dest_norm)][truck_norm] = rate in integer fils
+      cities: set of display city names
+      cicpa_set: set of dest_norm (only if cicpa=True)
+      trucks_found: set of normalized truck keys found in this sheet
+    """
+    rates = {}
+    cities_display = set()
+    cicpa_set = set()
+    trucks_found = set()
+
+    max_row = ws.max_row
+    max_col = ws.max_column
+    if max_row < 3 or max_col < 2:       # city column plus at least one pickup/truck column
+        return rates, cities_display, cicpa_set, trucks_found
+
+    # row 1 => pickup headers (may be merged/blank; forward-fill)
+    # row 2 => truck types
+    pickups = []
+    trucks = []
+    last_pickup = ""
+    for c in range(2, max_col + 1):
+        p_cell = ws.cell(row=1, column=c).value
+        t_cell = ws.cell(row=2, column=c).value
+
+        p_raw = last_pickup if not p_cell or str(p_cell).strip() == "" else str(p_cell).strip()
+        last_pickup = p_raw
+        t_raw = str(t_cell or "").strip()
+
+        p_norm = PICKUP_ALIASES.get(p_raw.lower(), p_raw.lower())
+        t_norm = norm_truck(t_raw)
+
+        pickups.append(p_norm)
+        trucks.append(t_norm)
+
+    for r in range(3, max_row + 1):
+        city_disp = ws.cell(row=r, column=1).value
+        if not city_disp or str(city_disp).strip() == "":
+            continue
+        city_disp = str(city_disp).strip()
+        d_norm = norm_city(city_disp)
+        cities_display.add(city_disp)
+        if cicpa:
+            cicpa_set.add(d_norm)
+
+        for c in range(2, max_col + 1):
+            p_norm = pickups[c - 2]
+            t_norm = trucks[c - 2]
+
+            # keep only our allowed pickups and trucks
+            if p_norm not in PICKUP_ALIASES.values():
+                continue
+            if t_norm not in TRUCK_LABELS:
+                continue
+
+            val = ws.cell(row=r, column=c).value
+            if val is None or str(val).strip() == "":
+                continue
+
+            rate = to_fils(val)
+            p_canon = PICKUP_ALIASES.get(p_norm, p_norm)
+            key = (p_canon, d_norm)
+            rates.setdefault(key, {})[t_norm] = rate
+            trucks_found.add(t_norm)
+
+    return rates, cities_display, cicpa_set, trucks_found
+
+
+def load_rates():
+    rates = {}
+    cities = set()
+    cicpa_set_all = set()
+    local_trucks = set()
+    cicpa_trucks = set()
+
+    xlsx_paths = [
+        os.path.join(BASE_DIR, "transport_rates.csv.xlsx"),
+        os.path.join(BASE_DIR, "transport_rates.xlsx"),
+    ]
+    xlsx_path = next((p for p in xlsx_paths if os.path.exists(p)), None)
+    if not xlsx_path:
+        print("[transport] rates .xlsx not found")
+        return rates
+
+    try:
+        fresh = os.path.getmtime(SHARED_RATES_FILE) >= os.path.getmtime(xlsx_path)
+    except OSError:
+        fresh = False
+    table = attach_shared_rates(SHARED_RATES_FILE) if fresh else None
+    if table:
+        # the table stands in for the sheet: lanes are read from the mapping, not copied here
+        with _shared_rates_lock:
+            _swap_shared_rates(table)
+        print(f"[transport] using shared rate table generation {table['generation']} "
+              f"({len(table['dests'])} destinations)")
+        return rates
+
+    from openpyxl import load_workbook   # heavy: only loaded when a sheet is read
+    wb = load_workbook(xlsx_path, data_only=True)
+
+    # Local sheet
+    local_ws = None
+    for name in wb.sheetnames:
+        if name.strip().lower() == "local":
+            local_ws = wb[name]
+            break
+    if local_ws:
+        r1, c1, s1, t1 = load_rates_from_matrix(local_ws, cicpa=False)
+        for k, v in r1.items():
+            rates.setdefault(k, {}).update(v)
+        cities |= c1
+        local_trucks |= t1
+    else:
+        print("[transport] 'Local' sheet not found")
+
+    # CICPA sheet
+    cicpa_ws = None
+    for name in wb.sheetnames:
+        if name.strip().lower() == "cicpa":
+            cicpa_ws = wb[name]
+            break
+    if cicpa_ws:
+        r2, c2, s2, t2 = load_rates_from_matrix(cicpa_ws, cicpa=True)
+        for k, v in r2.items():
+            rates.setdefault(k, {}).update(v)
+        cities |= c2
+        cicpa_set_all |= s2
+        cicpa_trucks |= t2
+    else:
+        print("[transport] 'CICPA' sheet not found")
+
+    # metadata used by template / JS
+    rates["__cities_display__"] = sorted(cities)
+    rates["__cicpa__"] = cicpa_set_all
+    rates["__local_trucks__"] = sorted(TRUCK_LABELS[t] for t in local_trucks if t in TRUCK_LABELS)
+    rates["__cicpa_trucks__"] = sorted(TRUCK_LABELS[t] for t in cicpa_trucks if t in TRUCK_LABELS)
+
+    print(
+        f"[transport] loaded {len([k for k in rates.keys() if isinstance(k, tuple)])} routes, "
+        f"{len(rates.get('__cities_display__', []))} destinations, "
+        f"CICPA cities: {len(cicpa_set_all)}, "
+        f"local trucks: {len(rates['__local_trucks__'])}, CICPA trucks: {len(rates['__cicpa_trucks__'])}"
+    )
+    return rates
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Shared lane-rate table: the lane rates as one flat int32 array in a file that
+# every worker mmaps read-only, so lookups touch shared pages instead of
+# per-process dicts. Under gunicorn the master publishes it before forking
+# (on_starting, see gunicorn.conf.py) and workers inherit the mapping.
+# Publishing a new table (atomic rename, generation + 1) is picked up by every
+# worker within SHARED_RATES_CHECK_SECONDS; the lane rates, the destination /
+# CICPA / truck metadata and the preview index (with its version) all come
+# from the same generation. A replaced mapping is closed once
+# SHARED_RATES_RETIRE_SECONDS have passed, so lookups still using it finish.
+#
+# Layout: header | names JSON (pickups, destinations, trucks, RATES metadata)
+# | rate index JSON (build_rate_index) | int32 fils [pickup][destination][truck],
+# -1 where the sheet has no rate.
+# A table newer than the rate sheet also stands in for it at startup, so
+# processes that only price (e.g. chat workers) never load openpyxl.
+# ──────────────────────────────────────────────────────────────────────────────
+SHARED_RATES_FILE = os.environ.get("SHARED_RATES_FILE", os.path.join(INSTANCE_DIR, "rates.bin"))
+SHARED_RATES_CHECK_SECONDS = 2.0
+SHARED_RATES_RETIRE_SECONDS = 30.0
+SHARED_RATES_MAGIC = b"DSVRATE2"
+# magic, generation, pickups, destinations, trucks, names length, index length
+_SHARED_HEADER = struct.Struct("=8sQIIIII")
+
+_shared_rates = None
+_shared_rates_checked = 0.0
+_shared_rates_retired = []   # [(retired at, table)] still mapped
+_shared_rates_lock = threading.Lock()
+
+def rates_meta(rates):
+    """Destination / CICPA / truck metadata of a RATES-shaped dict."""
+    return {
+        "cities_display": rates.get("__cities_display__", []),
+        "cicpa": frozenset(rates.get("__cicpa__", set())),
+        "local_trucks": rates.get("__local_trucks__", []),
+        "cicpa_trucks": rates.get("__cicpa_trucks__", []),
+    }
+
+def shared_rates_payload(rates):
+    """(counts, names bytes, index bytes, cells bytes) of the table for a RATES-shaped dict."""
+    lanes = [(k, v) for k, v in rates.items() if isinstance(k, tuple)]
+    pickups = sorted({o for (o, _), _ in lanes})
+    dests = sorted({d for (_, d), _ in lanes})
+    trucks = sorted(TRUCK_LABELS)
+    cells = array("i", [-1]) * (len(pickups) * len(dests) * len(trucks))
+    p_ix = {p: i for i, p in enumerate(pickups)}
+    d_ix = {d: i for i, d in enumerate(dests)}
+    for (o, d), cell in lanes:
+        base = (p_ix[o] * len(dests) + d_ix[d]) * len(trucks)
+        for i, t in enumerate(trucks):
+            fils = cell.get(t)
+            if fils is not None:
+                cells[base + i] = fils
+    meta = rates_meta(rates)
+    index = build_rate_index(lanes, meta)["body"]
+    meta = {**meta, "cicpa": sorted(meta["cicpa"])}
+    names = json.dumps({"pickups": pickups, "dests": dests, "trucks": trucks, "meta": meta},
+                       ensure_ascii=False).encode("utf-8")
+    names += b" " * (-(len(names) + len(index)) % cells.itemsize)   # align the cells
+    return (len(pickups), len(dests), len(trucks)), names, index, cells.tobytes()
+
+def publish_shared_rates(rates, path=SHARED_RATES_FILE):
+    """
+    Writes the lane rates as the next generation of the shared table, unless
+    the published table already holds exactly these rates.
+    Returns the generation in effect.
+    """
+    counts, names, index, cells = shared_rates_payload(rates)
+    current = attach_shared_rates(path)
+    if current:
+        same, generation = current["payload"] == names + index + cells, current["generation"]
+        close_shared_rates(current)
+        if same:
+            os.utime(path)   # still current: mark it fresh against the rate sheet
+            return generation
+    generation = generation + 1 if current else 1
+    header = _SHARED_HEADER.pack(SHARED_RATES_MAGIC, generation, *counts, len(names), len(index))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header + names + index + cells)
+    os.replace(tmp, path)
+    print(f"[transport] shared rate table generation {generation}: {counts[1]} destinations, {os.path.getsize(path)} bytes")
+    return generation
+
+def attach_shared_rates(path=SHARED_RATES_FILE):
+    """Maps the shared table read-only. Returns its view dict, or None if absent/invalid."""
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, generation, n_p, n_d, n_t, n_names, n_index = _SHARED_HEADER.unpack_from(mm)
+        if magic != SHARED_RATES_MAGIC:
+            raise ValueError("not a rate table")
+        start = _SHARED_HEADER.size
+        names = json.loads(mm[start:start + n_names])
+        pickups, dests, trucks, meta = names["pickups"], names["dests"], names["trucks"], names["meta"]
+        cells_at = start + n_names + n_index
+        if len(mm) != cells_at + 4 * n_p * n_d * n_t:
+            raise ValueError("truncated rate table")
+        index = rate_index_entry(mm[start + n_names:cells_at])
+    except (struct.error, ValueError, KeyError, TypeError):
+        mm.close()
+        return None
+    view = memoryview(mm)
+    return {
+        "generation": generation,
+        "file": (st.st_ino, st.st_mtime_ns),
+        "key": (generation, (st.st_ino, st.st_mtime_ns)),
+        "mm": mm,
+        "view": view,
+        "payload": view[start:],
+        "pickups": {p: i for i, p in enumerate(pickups)},
+        "dests": {d: i for i, d in enumerate(dests)},
+        "trucks": {t: i for i, t in enumerate(trucks)},
+        "meta": {**meta, "cicpa": frozenset(meta["cicpa"])},
+        "index": index,
+        "cells": view[cells_at:].cast("i"),
+    }
+
+def close_shared_rates(table):
+    """Unmaps a table; every view of it has to be released first."""
+    for key in ("cells", "payload", "view"):
+        table[key].release()
+    table["mm"].close()
+
+def _swap_shared_rates(table):
+    # caller holds _shared_rates_lock
+    global _shared_rates, _shared_rates_checked
+    now = time.monotonic()
+    if _shared_rates is not None:
+        _shared_rates_retired.append((now, _shared_rates))
+    _shared_rates, _shared_rates_checked = table, now
+
+def _close_retired_rates(now):
+    # caller holds _shared_rates_lock
+    while _shared_rates_retired and now - _shared_rates_retired[0][0] >= SHARED_RATES_RETIRE_SECONDS:
+        _, table = _shared_rates_retired.pop(0)
+        try:
+            close_shared_rates(table)
+        except BufferError:
+            print(f"[transport] rate table generation {table['generation']} still in use, left mapped")
+
+def shared_rates():
+    """
+    The attached table, re-attached when a new generation has been published.
+    A process that attached none (load_rates found the file older than the
+    sheet, or there was no file) keeps its own RATES and never picks one up.
+    """
+    global _shared_rates_checked
+    now = time.monotonic()
+    if _shared_rates is None:
+        return None
+    if now - _shared_rates_checked < SHARED_RATES_CHECK_SECONDS or not _shared_rates_lock.acquire(blocking=False):
+        return _shared_rates
+    try:
+        _shared_rates_checked = now
+        _close_retired_rates(now)
+        try:
+            st = os.stat(SHARED_RATES_FILE)
+            changed = (st.st_ino, st.st_mtime_ns) != _shared_rates["file"]
+        except OSError:
+            changed = False
+        if changed:
+            table = attach_shared_rates(SHARED_RATES_FILE)
+            if table and table["key"] != _shared_rates["key"]:
+                _swap_shared_rates(table)
+            elif table:
+                close_shared_rates(table)
+    finally:
+        _shared_rates_lock.release()
+    return _shared_rates
+
+def shared_rate(table, o, d, t):
+    """Rate in fils from the shared table, or None."""
+    p, c, k = table["pickups"].get(o), table["dests"].get(d), table["trucks"].get(t)
+    if p is None or c is None or k is None:
+        return None
+    fils = table["cells"][(p * len(table["dests"]) + c) * len(table["trucks"]) + k]
+    return fils if fils >= 0 else None
+
+def init_shared_rates(path=SHARED_RATES_FILE):
+    """
+    Publishes this process's sheet rates as the shared table (a no-op when the
+    same table is already published) and attaches to it. Called from the
+    gunicorn master before workers fork, never on import.
+    """
+    if any(isinstance(k, tuple) for k in RATES):
+        publish_shared_rates(RATES, path)
+    table = attach_shared_rates(path)
+    if table:
+        with _shared_rates_lock:
+            _swap_shared_rates(table)
+    return table
+
+def rate_state():
+    """
+    The rates in effect: the attached shared table, else this process's RATES.
+    Both carry "key" (None for RATES), "meta" (see rates_meta) and "index".
+    """
+    table = shared_rates()
+    return table if table is not None else _local_rates
+
+def lane_rates(state=None):
+    """((pickup, destination), {truck: fils}) for every lane with a rate."""
+    state = state or rate_state()
+    if "cells" not in state:
+        return [(k, v) for k, v in RATES.items() if isinstance(k, tuple)]
+    cells, trucks = state["cells"], sorted(state["trucks"], key=state["trucks"].get)
+    n_d, n_t = len(state["dests"]), len(trucks)
+    out = []
+    for o, p in state["pickups"].items():
+        for d, c in state["dests"].items():
+            base = (p * n_d + c) * n_t
+            cell = {t: cells[base + i] for i, t in enumerate(trucks) if cells[base + i] >= 0}
+            if cell:
+                out.append(((o, d), cell))
+    return out
+
+def rate_meta():
+    return rate_state()["meta"]
+
+def current_rate_index():
+    """{"body", "etag", "version"} of the preview index for the rates in effect."""
+    return rate_state()["index"]
+
+def cicpa_required_for(city: str) -> bool:
+    return norm_city(city) in rate_meta()["cicpa"]
+
+TRUCK_BY_LABEL = {v.lower(): k for k, v in TRUCK_LABELS.items()}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Customer rate cards: customer_rates/<customer>.xlsx (same Local/CICPA matrix
+# layout, only the negotiated lanes filled in) layered over the base RATES.
+# Each card is read lazily into a flat {(pickup, dest, truck): fils} override
+# map — never a copy of RATES — and kept in a small LRU, reloaded on change.
+# ──────────────────────────────────────────────────────────────────────────────
+CUSTOMER_RATES_DIR = os.path.join(BASE_DIR, "customer_rates")
+CUSTOMER_CARDS_MAX = 32
+
+_customer_cards = OrderedDict()   # customer -> (mtime, overrides)
+_customer_cards_lock = threading.Lock()
+
+def customer_key(customer):
+    """Normalized customer id, or "" for none / anything that is not a plain name."""
+    c = (customer or "").strip().lower().replace(" ", "_")
+    return c if re.fullmatch(r"[a-z0-9_\-]{1,64}", c) else ""
+
+def customer_card_path(customer):
+    path = os.path.join(CUSTOMER_RATES_DIR, f"{customer}.xlsx")
+    return path if os.path.exists(path) else None
+
+def load_customer_card(path):
+    overrides = {}
+    from openpyxl import load_workbook
+    wb = load_workbook(path, data_only=True)
+    for name in wb.sheetnames:
+        rates, _, _, _ = load_rates_from_matrix(wb[name], cicpa=False)
+        for (o, d), cell in rates.items():
+            for t, fils in cell.items():
+                overrides[(o, d, t)] = fils
+    return overrides
+
+def customer_overrides(customer):
+    """
+    Override map for a customer id (see customer_key), built on first use.
+    Returns {} for no customer and None for an unknown one.
+    """
+    if not customer:
+        return {}
+    path = customer_card_path(customer)
+    if path is None:
+        return None
+    mtime = os.path.getmtime(path)
+    with _customer_cards_lock:
+        cached = _customer_cards.get(customer)
+        if cached and cached[0] == mtime:
+            _customer_cards.move_to_end(customer)
+            return cached[1]
+    overrides = load_customer_card(path)
+    with _customer_cards_lock:
+        _customer_cards[customer] = (mtime, overrides)
+        _customer_cards.move_to_end(customer)
+        while len(_customer_cards) > CUSTOMER_CARDS_MAX:
+            _customer_cards.popitem(last=False)
+    print(f"[transport] customer card {customer!r}: {len(overrides)} lane rates")
+    return overrides
+
+def lookup_rate(origin_disp, destination_disp, truck_label, cargo_type, customer=""):
+    o = PICKUP_ALIASES.get((origin_disp or "").strip().lower(), (origin_disp or "").strip().lower())
+    d = norm_city(destination_disp)
+    t = TRUCK_BY_LABEL.get((truck_label or "").strip().lower(), norm_truck(truck_label))
+    if customer:
+        rate = (customer_overrides(customer) or {}).get((o, d, t))
+        if rate is not None:
+            return rate
+    table = shared_rates()
+    if table is not None:
+        return shared_rate(table, o, d, t)
+    cell = RATES.get((o, d))
+    if not cell:
+        return None
+    return cell.get(t)
+
+BACK_LOAD_MULT = 160   # per MULT_DEN: same-day return is +60% of the trip rate
+ONE_WAY_MULT = 100
+
+def trip_mult(trip):
+    return BACK_LOAD_MULT if trip == "back_load" else ONE_WAY_MULT
+
+def trucks_allowed_for(destination):
+    """Display labels of the trucks that may run to a destination (CICPA vs local fleet)."""
+    meta = rate_meta()
+    return set(meta["cicpa_trucks" if norm_city(destination) in meta["cicpa"] else "local_trucks"] or [])
+
+def unit_price(origin, destination, t_key, trip, cargo_type="general", customer=""):
+    """
+    Price of one truck on one lane, from the customer's card where it has one.
+    Returns (unit, status): unit is an int in 1/MULT_DEN fils (see round_fils)
+    or None, status is "ok", "not_available" (CICPA/local fleet) or "no_rate".
+    """
+    label = TRUCK_LABELS[t_key]
+    if label not in trucks_allowed_for(destination):
+        return None, "not_available"
+    base_rate = lookup_rate(origin, destination, label, cargo_type, customer)
+    if base_rate is None:
+        return None, "no_rate"
+    return base_rate * trip_mult(trip), "ok"
+
+def build_rate_index(lanes, meta):
+    """
+    Compact copy of the lane rates for the live price preview in chatbot.js.
+    Rates are integer fils (scale 100) and trip multipliers are [num, den], so
+    the browser can reproduce unit_price() × qty and its rounding exactly.
+    lanes: [((pickup, destination), {truck: fils})], meta: see rates_meta.
+    Returns {"body": JSON bytes, "etag", "version"}.
+    """
+    trucks = sorted(TRUCK_LABELS)
+    rates = {}
+    for (pickup, dest), cell in sorted(lanes):
+        rates.setdefault(PICKUP_LABELS.get(pickup, pickup), {})[dest] = [cell.get(t) for t in trucks]
+    index = {
+        "scale": 100,
+        "trucks": [TRUCK_LABELS[t] for t in trucks],
+        "trip": {
+            "one_way": [ONE_WAY_MULT, MULT_DEN],
+            "back_load": [BACK_LOAD_MULT, MULT_DEN],
+        },
+        "cicpa": sorted(meta["cicpa"]),
+        "local_trucks": meta["local_trucks"],
+        "cicpa_trucks": meta["cicpa_trucks"],
+        "rates": rates,
+    }
+    return rate_index_entry(json.dumps(index, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+def rate_index_entry(body):
+    version = hashlib.sha1(body).hexdigest()[:12]
+    return {"body": body, "etag": version, "version": version}
+
+
+RATES = load_rates()
+# this process's own rates, in effect while no shared table is attached
+_local_rates = {"key": None, "meta": rates_meta(RATES), "index": None}
+_local_rates["index"] = build_rate_index(lane_rates(_local_rates), _local_rates["meta"])
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Quote pricing (shared by the form, quote jobs and the archive)
+# ──────────────────────────────────────────────────────────────────────────────
+def price_transport_quote(form):
+    """
+    Prices a transport form (request.form or any MultiDict with the same fields).
+    Returns a dict with the header fields, the per-truck table rows and totals
+    (subtotal / grand_total in integer fils).
+    """
+    origin         = (form.get("origin") or "").strip()
+    destination    = (form.get("destination") or "").strip()
+    main_trip      = (form.get("trip_type") or "one_way").strip()   # top radio
+    cargo_type     = (form.get("cargo_type") or "general").strip().lower()
+    customer       = customer_key(form.get("customer"))
+    rate_version   = current_rate_index()["version"]
+
+    truck_types    = form.getlist("truck_type[]") or []
+    truck_qty_list = form.getlist("truck_qty[]") or []
+    per_row_trips_raw = form.getlist("trip_kind[]") or []
+
+    def norm_trip(v):
+        v = (v or "").strip().lower()
+        return v if v in ("one_way", "back_load") else main_trip
+
+    per_row_trips = [norm_trip(v) for v in per_row_trips_raw]
+
+    chosen_trucks = []
+    for t_label, q in zip(truck_types, truck_qty_list):
+        try:
+            qty = int(float(q or "0"))
+        except Exception:
+            qty = 0
+        if qty <= 0:
+            continue
+
+        norm_key = None
+        for k, v in TRUCK_LABELS.items():
+            if v.lower() == (t_label or "").strip().lower():
+                norm_key = k
+                break
+        norm_key = norm_key or norm_truck(t_label)
+        if norm_key in TRUCK_LABELS:
+            chosen_trucks.append((norm_key, qty))
+
+    N = len(chosen_trucks)
+    M = len(per_row_trips)
+    if M >= N:
+        row_trip_list = per_row_trips[:N]
+    else:
+        prefix = [main_trip] * (N - M)
+        row_trip_list = prefix + per_row_trips
+
+    is_cicpa_city = cicpa_required_for(destination)
+    cicpa_flag = " (CICPA)" if is_cicpa_city else " (Non-CICPA)"
+
+    subtotal = 0
+    per_truck_rows = []
+    header_trip_labels = []
+
+    for (t_key, qty), row_trip in zip(chosen_trucks, row_trip_list):
+        label = TRUCK_LABELS[t_key]
+        row_trip_tag = " (Back Load)" if row_trip == "back_load" else ""
+        header_trip_labels.append("Back Load" if row_trip == "back_load" else "One Way")
+
+        unit_per_truck, status = unit_price(origin, destination, t_key, row_trip, cargo_type, customer)
+        if status == "not_available":
+            per_truck_rows.append(
+                (f"{label} x {qty} — {origin} → {destination}{cicpa_flag} (Not available for this selection)",
+                 "", "")
+            )
+            continue
+        if status == "no_rate":
+            per_truck_rows.append(
+                (f"{label} x {qty} — {origin} → {destination}{cicpa_flag} (No rate found)",
+                 "", "")
+            )
+            continue
+
+        combined = unit_per_truck * qty
+
+        per_truck_rows.append(
+            (f"{label} x {qty} — {origin} → {destination}{cicpa_flag}{row_trip_tag}",
+             f"AED {money_fils(round_fils(unit_per_truck))}",
+             f"AED {money_fils(round_fils(combined))}")
+        )
+        subtotal += combined
+
+    grand_total = subtotal = round_fils(subtotal)
+
+    if not header_trip_labels:
+        trip_label_for_header = "One Way" if main_trip == "one_way" else "Back Load"
+    else:
+        uniq = set(header_trip_labels)
+        trip_label_for_header = uniq.pop() if len(uniq) == 1 else "Mixed"
+
+    truck_summary = "; ".join(f"{TRUCK_LABELS[t]} x {q}" for t, q in chosen_trucks) or "N/A"
+    route_str = f"{origin} \u2192 {destination}{cicpa_flag}" if (origin and destination) else "N/A"
+
+    return {
+        "origin": origin,
+        "destination": destination,
+        "cargo_type": cargo_type,
+        "customer": customer,
+        "is_cicpa": is_cicpa_city,
+        "cicpa_flag": cicpa_flag,
+        "trip_label": trip_label_for_header,
+        "truck_summary": truck_summary,
+        "route": route_str,
+        "trucks": chosen_trucks,
+        "rows": per_truck_rows,
+        "subtotal": subtotal,
+        "grand_total": grand_total,
+        "rate_version": rate_version,
+    }
@@ -0,0 +1,108 @@
+"""
+DOCX quotation rendering. python-docx (and lxml) are imported on first
+render, so processes that never render a quote never load them.
+"""
+from datetime import datetime
+import io, os
+
+from pricing import money_fils
+
+QUOTE_TEMPLATE = os.path.join("templates", "TransportQuotation.docx")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Word helpers
+# ──────────────────────────────────────────────────────────────────────────────
+def replace_in_paragraph(paragraph, mapping):
+    if not paragraph.runs:
+        return
+    original = "".join(r.text for r in paragraph.runs)
+    replaced = original
+    for k, v in mapping.items():
+        replaced = replaced.replace(k, v)
+    if replaced != original:
+        for r in paragraph.runs:
+            r.text = ""
+        paragraph.runs[0].text = replaced
+
+def replace_everywhere(doc, mapping):
+    for p in doc.paragraphs:
+        replace_in_paragraph(p, mapping)
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                for p in cell.paragraphs:
+                    replace_in_paragraph(p, mapping)
+
+def find_details_table(doc):
+    for tbl in doc.tables:
+        if not tbl.rows:
+            continue
+        header = " | ".join(c.text.strip() for c in tbl.rows[0].cells)
+        if "Item" in header and "Unit Rate" in header and "Amount" in header:
+            return tbl
+    return None
+
+def clear_table_body(table):
+    while len(table.rows) > 1:
+        table._tbl.remove(table.rows[1]._tr)
+
+def add_row(table, item, unit_rate="", amount=""):
+    row = table.add_row()
+    cells = row.cells
+    if len(cells) >= 1: cells[0].text = str(item)
+    if len(cells) >= 2: cells[1].text = str(unit_rate)
+    if len(cells) >= 3: cells[2].text = str(amount)
+    return row
+
+def emphasize_row(row, font_pt=12):
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt
+    for i, cell in enumerate(row.cells):
+        for p in cell.paragraphs:
+            p.alignment = WD_ALIGN_PARAGRAPH.RIGHT if i == (len(row.cells)-1) else WD_ALIGN_PARAGRAPH.LEFT
+            for run in p.runs:
+                run.font.bold = True
+                run.font.size = Pt(font_pt)
+
+def render_transport_quote(quote):
+    """Fills TransportQuotation.docx for a priced quote. Returns (docx bytes, download name)."""
+    from docx import Document   # heavy (lxml): only loaded when a quote is rendered
+    doc = Document(QUOTE_TEMPLATE)
+    origin, destination = quote["origin"], quote["destination"]
+    per_truck_rows, grand_total = quote["rows"], quote["grand_total"]
+    placeholders = {
+        "{{TODAY_DATE}}": datetime.today().strftime("%d %b %Y"),
+        "{{FROM}}":       origin or "N/A",
+        "{{TO}}":         (destination or "N/A") + quote["cicpa_flag"],
+        "{{TRUCK_TYPE}}": quote["truck_summary"],
+        "{{GENERAL}}":    "General Cargo" if quote["cargo_type"] == "general" else "",
+        "{{CHEMICAL}}":   "Chemical Load" if quote["cargo_type"] == "chemical" else "",
+        "{{TRIP_TYPE}}":  quote["trip_label"],
+        "{{CICPA}}":      "Yes" if quote["is_cicpa"] else "No",
+        "{{ROUTE}}":      quote["route"],
+        "{{UNIT_RATE}}":  money_fils(quote["subtotal"]),
+        "{{TOTAL_FEE}}":  money_fils(grand_total),
+    }
+    replace_everywhere(doc, placeholders)
+
+    table = find_details_table(doc)
+    if table:
+        clear_table_body(table)
+        for desc, unit_rate, amount in per_truck_rows:
+            add_row(table, desc, unit_rate, amount)
+        gt_row = add_row(table, "GRAND TOTAL", "", f"AED {money_fils(grand_total)}")
+        emphasize_row(gt_row, font_pt=12)
+    else:
+        doc.add_paragraph("Quotation Details (Auto)")
+        small = doc.add_table(rows=1, cols=3)
+        hdr = small.rows[0].cells
+        hdr[0].text, hdr[1].text, hdr[2].text = "Item", "Unit Rate", "Amount (AED)"
+        for desc, unit_rate, amount in per_truck_rows:
+            add_row(small, desc, unit_rate, amount)
+        gt_row = add_row(small, "GRAND TOTAL", "", f"AED {money_fils(grand_total)}")
+        emphasize_row(gt_row, font_pt=12)
+
+    buf = io.BytesIO()
+    doc.save(buf)
+    download_name = f"Transport_Quotation_{(origin or 'Origin').replace(' ','')}To{(destination or 'Destination').replace(' ','')}.docx"
+    return buf.getvalue(), download_name
@@ -0,0 +1,55 @@
+"""
+BM25 retrieval over short documents (the chat knowledge base's rules), used
+as the chat fallback when no rule pattern matches. Term weights are computed
+once per index; a query only walks the postings of its own terms.
+"""
+import math, re
+
+def tokenize(text, stopwords=frozenset()):
+    """Lower-case word tokens without stopwords, plural "s" stripped."""
+    out = []
+    for w in re.findall(r"[a-z0-9]+", text.lower()):
+        if w in stopwords or len(w) < 2:
+            continue
+        if len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        out.append(w)
+    return out
+
+def build_bm25_index(docs, k1=1.2, b=0.75):
+    """
+    docs: list of token lists. Returns {"postings": {term: [(doc, weight)]},
+    "n": number of docs}, with weight the term's full BM25 contribution.
+    """
+    n = len(docs)
+    avgdl = sum(len(d) for d in docs) / n if n else 0.0
+    tf = {}
+    for i, doc in enumerate(docs):
+        for term in doc:
+            counts = tf.setdefault(term, {})
+            counts[i] = counts.get(i, 0) + 1
+    postings = {}
+    for term, counts in tf.items():
+        idf = math.log(1 + (n - len(counts) + 0.5) / (len(counts) + 0.5))
+        postings[term] = [
+            (i, idf * c * (k1 + 1) / (c + k1 * (1 - b + b * len(docs[i]) / avgdl)))
+            for i, c in counts.items()
+        ]
+    return {"postings": postings, "n": n}
+
+def bm25_best(index, terms):
+    """
+    Best document for the query terms: (doc, score, coverage) where coverage
+    is the share of distinct query terms the document contains; None if no
+    query term is indexed.
+    """
+    terms = set(terms)
+    scores, hits = {}, {}
+    for term in terms:
+        for i, w in index["postings"].get(term, ()):
+            scores[i] = scores.get(i, 0.0) + w
+            hits[i] = hits.get(i, 0) + 1
+    if not scores:
+        return None
+    best = max(scores, key=lambda i: (scores[i], -i))
+    return best, scores[best], hits[best] / len(terms)
@@ -0,0 +1,88 @@
+"""
+Typo correction for chat messages: a symmetric-delete (SymSpell-style) index
+over a known vocabulary. A word and a typo within edit distance d share a
+string reachable by at most d deletes from each, so a lookup only generates
+the typo's deletes and checks the few words filed under them.
+"""
+import re
+
+SPELL_CACHE_MAX = 50000   # corrected tokens remembered per index
+
+def _deletes(word, depth):
+    out = {word}
+    edge = {word}
+    for _ in range(depth):
+        edge = {w[:i] + w[i + 1:] for w in edge for i in range(len(w))}
+        out |= edge
+    return out
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (transpositions count 1); limit + 1 if above limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+def load_word_list(path):
+    """One lower-case word per line; blank lines and # comments are skipped."""
+    with open(path, encoding="utf-8") as f:
+        return frozenset(w for w in (ln.strip().lower() for ln in f) if w and not w.startswith("#"))
+
+def build_spell_index(counts, min_length=5, max_distance=2, long_word=8, english=frozenset()):
+    """
+    counts: {word: frequency} of known words (frequency breaks ties).
+    english: valid words that are left alone even if they are not in counts
+    (otherwise "tender" would become "mender" and "border" "order").
+    Tokens shorter than min_length are never corrected; tokens shorter than
+    long_word get at most one edit, longer ones up to max_distance.
+    """
+    deletes = {}
+    for word in counts:
+        if len(word) < min_length - max_distance:
+            continue
+        for d in _deletes(word, max_distance):
+            deletes.setdefault(d, []).append(word)
+    return {"words": counts, "deletes": deletes, "min_length": min_length,
+            "max_distance": max_distance, "long_word": long_word, "english": english, "cache": {}}
+
+def correct_word(index, word):
+    """The closest known word (most frequent on ties), or word itself."""
+    if len(word) < index["min_length"] or word in index["words"] or word in index["english"]:
+        return word
+    cache = index["cache"]
+    hit = cache.get(word)
+    if hit is not None:
+        return hit
+    limit = index["max_distance"] if len(word) >= index["long_word"] else 1
+    best, best_key = word, None
+    seen = set()
+    for d in _deletes(word, limit):
+        for cand in index["deletes"].get(d, ()):
+            if cand in seen:
+                continue
+            seen.add(cand)
+            dist = edit_distance(word, cand, limit)
+            if dist <= limit:
+                key = (dist, -index["words"][cand], cand)
+                if best_key is None or key < best_key:
+                    best, best_key = cand, key
+    if len(cache) >= SPELL_CACHE_MAX:
+        cache.clear()
+    cache[word] = best
+    return best
+
+_WORD = re.compile(r"[a-z]+")
+
+def correct_text(index, text):
+    """Lower-case text with every unknown word replaced by its correction."""
+    return _WORD.sub(lambda m: correct_word(index, m.group(0)), text)
@@ -17,6 +17,23 @@ document.addEventListener('DOMContentLoaded', () => {
   const inputEl    = document.getElementById('chat-input');
   const msgsEl     = document.getElementById('chat-messages');
 
+  // One token per tab so the server can follow up on its own questions
+  // ("Which storage type?" -> "chemical" -> "AC").
+  const chatSession = (() => {
+    try {
+      let token = sessionStorage.getItem('dsvChatSession');
+      if (!token) {
+        token = (window.crypto && crypto.randomUUID)
+          ? crypto.randomUUID()
+          : Date.now().toString(36) + Math.random().toString(36).slice(2);
+        sessionStorage.setItem('dsvChatSession', token);
+      }
+      return token;
+    } catch {
+      return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+  })();
+
   if (chatToggle && chatBox && chatClose && sendBtn && inputEl && msgsEl) {
     chatToggle.addEventListener('click', () => chatBox.classList.toggle('open'));
     chatClose.addEventListener('click', () => chatBox.classList.remove('open'));
@@ -35,11 +52,18 @@ document.addEventListener('DOMContentLoaded', () => {
     appendMessage('user', text);
     inputEl.value = '';
 
+    const payload = JSON.stringify({ message: text, session: chatSession });
+    try {
+      if (await streamReply(payload)) return;
+    } catch {
+      // fall through to the plain JSON endpoint
+    }
+
     try {
       const res = await fetch('/chat', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ message: text })
+        body: payload
       });
       const data = await res.json();
       const reply = (data && data.reply) ? data.reply : '...';
@@ -50,26 +74,171 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   }
 
-  function appendMessage(sender, text, typewriter = false) {
+  // Reads /chat/stream (server-sent events, one {"text"} chunk per event) and
+  // shows each chunk as it arrives. Returns false if nothing was shown, so the
+  // caller can fall back to /chat.
+  async function streamReply(payload) {
+    if (!window.ReadableStream || !window.TextDecoder) return false;
+    const res = await fetch('/chat/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+      body: payload
+    });
+    if (!res.ok || !res.body) return false;
+
+    const reader  = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let out = null;
+
+    try {
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (value) buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) !== -1) {
+          const frame = buffer.slice(0, sep);
+          buffer = buffer.slice(sep + 2);
+          if (/^event: done$/m.test(frame)) {
+            if (out) out.end();
+            return !!out;
+          }
+          const data = frame.split('\n')
+            .filter(l => l.startsWith('data: '))
+            .map(l => l.slice(6))
+            .join('\n');
+          if (!data) continue;
+          const chunk = JSON.parse(data).text || '';
+          if (!out) out = openBotStream();
+          out.push(chunk);
+        }
+
+        if (done) {
+          if (out) out.end();
+          return !!out;
+        }
+      }
+    } catch (err) {
+      // a half-shown reply is kept rather than asking again
+      if (out) { out.end(); return true; }
+      throw err;
+    }
+  }
+
+  // A bot bubble fed incrementally: chunks are buffered and appended to one
+  // text node per animation frame; the final text is rendered once on end().
+  function openBotStream() {
+    const bubble = addBubble('bot');
+    const node = document.createTextNode('');
+    bubble.classList.add('streaming');
+    bubble.appendChild(node);
+
+    let full = '';
+    let pending = '';
+    let queued = false;
+    let ended = false;
+
+    function flush() {
+      queued = false;
+      if (pending) {
+        node.appendData(pending);
+        pending = '';
+      }
+      if (ended) finishBubble(bubble, full);
+      scrollToBottom();
+    }
+    function schedule() {
+      if (!queued) {
+        queued = true;
+        requestAnimationFrame(flush);
+      }
+    }
+
+    return {
+      push(chunk) { full += chunk; pending += chunk; schedule(); },
+      end() { ended = true; schedule(); }
+    };
+  }
+
+  // Typewriter: reveal ~1 char per 15 ms, but never take longer than
+  // TYPE_MAX_MS in total. Text is appended as a plain text node once per
+  // animation frame (one scroll per frame); markdown is rendered once at the end.
+  const TYPE_MS_PER_CHAR = 15;
+  const TYPE_MAX_MS      = 1500;
+
+  let scrollQueued = false;
+  function scrollToBottom() {
+    if (scrollQueued) return;
+    scrollQueued = true;
+    requestAnimationFrame(() => {
+      scrollQueued = false;
+      msgsEl.scrollTop = msgsEl.scrollHeight;
+    });
+  }
+
+  function escapeHTML(s) {
+    return s.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+  }
+
+  // **bold**, *italic* and line breaks — the only markdown the replies use
+  function renderMarkdown(text) {
+    return escapeHTML(text)
+      .replace(/\*\*(.+?)\*\*/g, '<strong>$1</strong>')
+      .replace(/(^|[^*])\*([^*\n]+)\*(?!\*)/g, '$1<em>$2</em>')
+      .replace(/\n/g, '<br>');
+  }
+
+  function typeInto(bubble, text) {
+    const node = document.createTextNode('');
+    bubble.classList.add('streaming');
+    bubble.appendChild(node);
+
+    const duration = Math.min(text.length * TYPE_MS_PER_CHAR, TYPE_MAX_MS);
+    const start = performance.now();
+    let shown = 0;
+
+    (function frame(now) {
+      const target = duration > 0
+        ? Math.min(text.length, Math.ceil(text.length * (now - start) / duration))
+        : text.length;
+      if (target > shown) {
+        node.appendData(text.slice(shown, target));
+        shown = target;
+        scrollToBottom();
+      }
+      if (shown < text.length) {
+        requestAnimationFrame(frame);
+      } else {
+        finishBubble(bubble, text);
+        scrollToBottom();
+      }
+    })(start);
+  }
+
+  function finishBubble(bubble, text) {
+    bubble.classList.remove('streaming');
+    bubble.innerHTML = /<[^>]+>/.test(text) ? text : renderMarkdown(text);
+  }
+
+  function addBubble(sender) {
     const wrapper = document.createElement('div');
     wrapper.className = `message ${sender}`;
     const bubble = document.createElement('div');
     bubble.className = 'bubble';
     wrapper.appendChild(bubble);
     msgsEl.appendChild(wrapper);
-    msgsEl.scrollTop = msgsEl.scrollHeight;
+    return bubble;
+  }
+
+  function appendMessage(sender, text, typewriter = false) {
+    const bubble = addBubble(sender);
 
     if (!typewriter) {
       bubble.innerHTML = text;
+      scrollToBottom();
     } else {
-      let i = 0;
-      (function typeChar(){
-        if (i < text.length) {
-          bubble.innerHTML += text.charAt(i++);
-          msgsEl.scrollTop = msgsEl.scrollHeight;
-          setTimeout(typeChar, 15);
-        }
-      })();
+      typeInto(bubble, text);
     }
   }
 
@@ -87,6 +256,7 @@ document.addEventListener('DOMContentLoaded', () => {
       document.querySelectorAll('.trip-options label').forEach(l => l.classList.remove('selected'));
       const label = radio.closest('label'); if (label) label.classList.add('selected');
       normalizeFirstRowUI();
+      schedulePreview();
     });
   });
 
@@ -95,21 +265,38 @@ document.addEventListener('DOMContentLoaded', () => {
     return checked ? checked.value : 'one_way';
   }
 
-  // CICPA filtering support (arrays injected by template)
-  const CICPA_CITIES = (window.CICPA_CITIES || []).map(s => (s || '').toLowerCase());
+  // CICPA filtering support (arrays injected by template), as sets built once
+  const CICPA_CITIES = new Set((window.CICPA_CITIES || []).map(s => (s || '').toLowerCase()));
   const LOCAL_TRUCKS = window.LOCAL_TRUCKS || [];
   const CICPA_TRUCKS = window.CICPA_TRUCKS || [];
-  function isCicpaCity(city){ return !!city && CICPA_CITIES.includes(String(city).toLowerCase().trim()); }
+  function isCicpaCity(city){ return !!city && CICPA_CITIES.has(String(city).toLowerCase().trim()); }
   function truckListForCity(city){ return isCicpaCity(city) ? CICPA_TRUCKS : LOCAL_TRUCKS; }
 
-  function buildOptions(list, current) {
-    const opts = ['<option value="">— Select Truck Type —</option>']
-      .concat(list.map(t => `<option value="${t}">${t}</option>`))
-      .join('');
-    const wrap = document.createElement('select');
-    wrap.innerHTML = opts;
-    if (current && list.includes(current)) wrap.value = current;
-    return wrap.innerHTML;
+  // One entry per distinct truck list: a ready <option> fragment to clone and
+  // the set of allowed labels. Lists with the same trucks share an entry.
+  const truckOptionCache = new Map();
+  function truckOptions(list) {
+    const key = list.join('\u0001');
+    let entry = truckOptionCache.get(key);
+    if (!entry) {
+      const fragment = document.createDocumentFragment();
+      fragment.appendChild(new Option('— Select Truck Type —', ''));
+      list.forEach(t => fragment.appendChild(new Option(t, t)));
+      entry = { fragment, allowed: new Set(list) };
+      truckOptionCache.set(key, entry);
+    }
+    return entry;
+  }
+
+  // Fills a truck <select> for a list, keeping the current choice if still allowed.
+  // Rows already showing the same set are left untouched.
+  function fillTruckSelect(sel, list) {
+    const entry = truckOptions(list);
+    if (sel._truckOptions === entry) return;
+    const cur = sel.value;
+    sel.replaceChildren(entry.fragment.cloneNode(true));
+    sel.value = entry.allowed.has(cur) ? cur : '';
+    sel._truckOptions = entry;
   }
 
   function currentCity(){ return destEl ? destEl.value : ''; }
@@ -125,13 +312,10 @@ document.addEventListener('DOMContentLoaded', () => {
     const row = document.createElement('div');
     row.className = 'truck-type-row';
 
-    const allowed = truckListForCity(currentCity());
-    const options = buildOptions(allowed, null);
-
     row.innerHTML = `
       <div class="select-wrapper">
         <label class="inline-label">Type</label>
-        <select name="truck_type[]" required>${options}</select>
+        <select name="truck_type[]" required></select>
       </div>
 
       <div class="qty-wrapper">
@@ -140,7 +324,10 @@ document.addEventListener('DOMContentLoaded', () => {
       </div>
 
       <button type="button" class="btn-remove" title="Remove Truck Type">Clear</button>
+
+      <div class="row-price" style="grid-column: 1 / span 3"></div>
     `;
+    fillTruckSelect(row.querySelector('select[name="truck_type[]"]'), truckListForCity(currentCity()));
 
     if (index === 0) {
       const hidden = document.createElement('input');
@@ -169,6 +356,7 @@ document.addEventListener('DOMContentLoaded', () => {
       const card = e.currentTarget.closest('.trip-card');
       if (card) card.remove();
       normalizeFirstRowUI();
+      schedulePreview();
     });
 
     return row;
@@ -196,6 +384,98 @@ document.addEventListener('DOMContentLoaded', () => {
     hidden.value = getGlobalTrip();
   }
 
+  // ---------- Live price preview ----------
+  // /rate_index.json mirrors the server rate sheet (integer rates + [num, den]
+  // trip multipliers), so unit and total match the quotation to the fils.
+  // Only the confirmed quote goes to /generate_transport.
+  const originEl = document.querySelector('[name="origin"]');
+  let rateIndex = null;
+  let totalEl = null;
+  let previewQueued = false;
+
+  function normCity(s) {
+    return String(s || '').trim().toLowerCase().replace(/\s+/g, ' ')
+      .replace(/_/g, ' ').replace(/[–—]/g, '-');
+  }
+
+  function gcd(a, b) { return b ? gcd(b, a % b) : a; }
+
+  // value = numer / denom AED (positive integers) -> "1,234.50", ROUND_HALF_UP
+  function formatAED(numer, denom) {
+    const fils = Math.floor((numer * 200 + denom) / (2 * denom));
+    const aed = Math.floor(fils / 100).toLocaleString('en-US');
+    return `${aed}.${String(fils % 100).padStart(2, '0')}`;
+  }
+
+  // per-index constants, computed once when the index arrives
+  let indexMetaFor = null, indexMetaCache = null;
+  function indexMeta(idx) {
+    if (indexMetaFor !== idx) {
+      const lcm = Object.values(idx.trip).map(m => m[1]).reduce((a, b) => a * b / gcd(a, b), 1);
+      indexMetaCache = {
+        lcm,
+        denom: idx.scale * lcm,
+        truckIndex: new Map(idx.trucks.map((t, i) => [t, i]))
+      };
+      indexMetaFor = idx;
+    }
+    return indexMetaCache;
+  }
+
+  function schedulePreview() {
+    if (previewQueued || !rateIndex) return;
+    previewQueued = true;
+    requestAnimationFrame(() => { previewQueued = false; updatePreview(); });
+  }
+
+  function updatePreview() {
+    if (!truckTypeContainer) return;
+    const idx = rateIndex;
+    const city = currentCity();
+    const lane = (idx.rates[originEl ? originEl.value : ''] || {})[normCity(city)];
+    const allowed = truckOptions(truckListForCity(city)).allowed;
+    const { lcm, denom, truckIndex } = indexMeta(idx);
+
+    let total = 0;
+    let priced = 0;
+    truckTypeContainer.querySelectorAll('.truck-type-row').forEach(row => {
+      const out = row.querySelector('.row-price');
+      if (!out) return;
+      const truck = row.querySelector('select[name="truck_type[]"]').value;
+      const qty = parseInt(row.querySelector('input[name="truck_qty[]"]').value, 10) || 0;
+      const tripEl = row.querySelector('[name="trip_kind[]"]');
+      const mult = idx.trip[tripEl ? tripEl.value : getGlobalTrip()] || idx.trip.one_way;
+
+      if (!lane || !truck || qty <= 0) { out.textContent = ''; return; }
+      if (!allowed.has(truck)) { out.textContent = 'Not available for this destination'; return; }
+      const base = lane[truckIndex.get(truck)];
+      if (base == null) { out.textContent = 'No rate found'; return; }
+
+      const unit = base * mult[0] * (lcm / mult[1]);
+      total += unit * qty;
+      priced += 1;
+      out.textContent = `AED ${formatAED(unit, denom)} × ${qty} = AED ${formatAED(unit * qty, denom)}`;
+    });
+
+    if (!totalEl) {
+      totalEl = document.createElement('div');
+      totalEl.className = 'live-total';
+      (addTruckTypeBtn || truckTypeContainer).insertAdjacentElement('afterend', totalEl);
+    }
+    totalEl.textContent = priced ? `Estimated total: AED ${formatAED(total, denom)}` : '';
+  }
+
+  if (truckTypeContainer) {
+    truckTypeContainer.addEventListener('input', schedulePreview);
+    truckTypeContainer.addEventListener('change', schedulePreview);
+    if (originEl) originEl.addEventListener('change', schedulePreview);
+
+    fetch(window.RATE_INDEX_URL || '/rate_index.json')
+      .then(res => res.ok ? res.json() : null)
+      .then(idx => { if (idx) { rateIndex = idx; schedulePreview(); } })
+      .catch(() => {});
+  }
+
   // ---------- Initialize: first card with Trip Type + first row ----------
   if (truckTypeContainer && addTruckTypeBtn) {
     const firstCard = makeCard();
@@ -217,9 +497,9 @@ document.addEventListener('DOMContentLoaded', () => {
     destEl.addEventListener('change', () => {
       const allowed = truckListForCity(currentCity());
       document.querySelectorAll('select[name="truck_type[]"]').forEach(typeSel => {
-        const cur = typeSel.value;
-        typeSel.innerHTML = buildOptions(allowed, cur);
+        fillTruckSelect(typeSel, allowed);
       });
+      schedulePreview();
     });
   }
 
@@ -0,0 +1,276 @@
+"""
+Warehouse storage and VAS tariffs, and the 3PL storage quotation calculator.
+Rates are integer fils, like the transport pricing in pricing.py.
+"""
+import re
+
+from pricing import money_fils, round_fils
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Tariff table (DSV Abu Dhabi). "per" is the billing unit:
+#   cbm_day  -> fils per CBM per day (indoor storage)
+#   sqm_year -> fils per SQM per year (open yard, prorated by day)
+# "vas" names the VAS tariff that applies, "handling" the VAS line charged per
+# CBM of throughput (in + out).
+# ──────────────────────────────────────────────────────────────────────────────
+STORAGE_TARIFFS = {
+    "standard_ac":        {"label": "Standard AC",        "fils": 250,   "per": "cbm_day",  "vas": "standard",  "handling": "in_out_handling"},
+    "standard_non_ac":    {"label": "Standard Non-AC",    "fils": 200,   "per": "cbm_day",  "vas": "standard",  "handling": "in_out_handling"},
+    "open_shed":          {"label": "Open Shed",          "fils": 180,   "per": "cbm_day",  "vas": "standard",  "handling": "in_out_handling"},
+    "chemical_ac":        {"label": "Chemical AC",        "fils": 350,   "per": "cbm_day",  "vas": "chemical",  "handling": "handling_palletized"},
+    "chemical_non_ac":    {"label": "Chemical Non-AC",    "fils": 270,   "per": "cbm_day",  "vas": "chemical",  "handling": "handling_palletized"},
+    "open_yard_kizad":    {"label": "Open Yard KIZAD",    "fils": 12500, "per": "sqm_year", "vas": "open_yard", "handling": None},
+    "open_yard_mussafah": {"label": "Open Yard Mussafah", "fils": 16000, "per": "sqm_year", "vas": "open_yard", "handling": None},
+}
+
+VAS_TARIFFS = {
+    "standard": {
+        "in_out_handling":  {"label": "In/Out Handling",     "fils": 2000,   "per": "cbm"},
+        "pallet_loading":   {"label": "Pallet Loading",      "fils": 1200,   "per": "pallet"},
+        "documentation":    {"label": "Documentation",       "fils": 12500,  "per": "set"},
+        "packing_pallet":   {"label": "Packing with pallet", "fils": 8500,   "per": "cbm"},
+        "inventory_count":  {"label": "Inventory Count",     "fils": 300000, "per": "event"},
+        "case_picking":     {"label": "Case Picking",        "fils": 250,    "per": "carton"},
+        "sticker_labeling": {"label": "Sticker Labeling",    "fils": 150,    "per": "label"},
+        "shrink_wrapping":  {"label": "Shrink Wrapping",     "fils": 600,    "per": "pallet"},
+        "vna_usage":        {"label": "VNA Usage",           "fils": 250,    "per": "pallet"},
+    },
+    "chemical": {
+        "handling_palletized": {"label": "Handling (Palletized)", "fils": 2000,   "per": "cbm"},
+        "handling_loose":      {"label": "Handling (Loose)",      "fils": 2500,   "per": "cbm"},
+        "documentation":       {"label": "Documentation",         "fils": 15000,  "per": "set"},
+        "packing_pallet":      {"label": "Packing with pallet",   "fils": 8500,   "per": "cbm"},
+        "inventory_count":     {"label": "Inventory Count",       "fils": 300000, "per": "event"},
+        "inner_bag_picking":   {"label": "Inner Bag Picking",     "fils": 350,    "per": "bag"},
+        "sticker_labeling":    {"label": "Sticker Labeling",      "fils": 150,    "per": "label"},
+        "shrink_wrapping":     {"label": "Shrink Wrapping",       "fils": 600,    "per": "pallet"},
+    },
+    "open_yard": {
+        "forklift_3_7t":       {"label": "Forklift (3T–7T)",           "fils": 9000,   "per": "hr"},
+        "forklift_10t":        {"label": "Forklift (10T)",             "fils": 20000,  "per": "hr"},
+        "forklift_15t":        {"label": "Forklift (15T)",             "fils": 32000,  "per": "hr"},
+        "crane_50t":           {"label": "Mobile Crane (50T)",         "fils": 25000,  "per": "hr"},
+        "crane_80t":           {"label": "Mobile Crane (80T)",         "fils": 45000,  "per": "hr"},
+        "container_lifting":   {"label": "Container Lifting",          "fils": 25000,  "per": "lift"},
+        "container_stripping": {"label": "Container Stripping (20ft)", "fils": 120000, "per": "hr"},
+    },
+}
+
+# 1 SQM ≈ 1.8 CBM for standard racked storage, as a ratio to stay in integers
+CBM_PER_SQM = (18, 10)
+VOLUME_DEN = 1000        # volumes are held in thousandths of a CBM / SQM
+DAYS_PER = {"day": 1, "week": 7, "month": 30, "year": 365}
+HANDLING_DAYS = 30       # throughput is CBM in + out per month
+
+def _volume(value, name):
+    v = float(value)
+    if v < 0 or v != v or v == float("inf"):
+        raise ValueError(f"{name} must be a positive number")
+    return round(v * VOLUME_DEN)
+
+def storage_days(spec):
+    """Storage period in days from days / weeks / months / years (default one month)."""
+    for unit, days in DAYS_PER.items():
+        value = spec.get(unit + "s")
+        if value not in (None, ""):
+            n = float(value)
+            if n <= 0 or n != n or n > 36500:
+                raise ValueError(f"{unit}s must be a positive number")
+            return max(1, round(n * days))
+    return DAYS_PER["month"]
+
+def storage_columns(specs):
+    """
+    Normalizes storage scenarios into columns (one list per field, same order).
+    A scenario: tariff (STORAGE_TARIFFS key), cbm or sqm stored, the period
+    (days / weeks / months / years), optional throughput_cbm (in + out per
+    month), loose (chemical loose handling) and vas {VAS key: qty over the period}.
+    Scenarios that do not parse get an entry in errors and are left out.
+    Returns (columns, errors) with errors as {index: message}.
+    """
+    cols = {"index": [], "tariff": [], "cbm": [], "sqm": [], "days": [], "throughput": [],
+            "handling": [], "vas": []}
+    errors = {}
+    for i, spec in enumerate(specs):
+        try:
+            if not isinstance(spec, dict):
+                raise ValueError("scenario must be an object")
+            key = (spec.get("tariff") or "").strip().lower()
+            tariff = STORAGE_TARIFFS.get(key)
+            if tariff is None:
+                raise ValueError(f"tariff must be one of {', '.join(STORAGE_TARIFFS)}")
+            cbm = _volume(spec["cbm"], "cbm") if spec.get("cbm") not in (None, "") else None
+            sqm = _volume(spec["sqm"], "sqm") if spec.get("sqm") not in (None, "") else None
+            if cbm is None and sqm is None:
+                raise ValueError("give cbm or sqm")
+            # fill in the other unit with the 1 SQM ≈ 1.8 CBM rule
+            num, den = CBM_PER_SQM
+            if cbm is None:
+                cbm = round_fils(sqm * num, den)
+            elif sqm is None:
+                sqm = round_fils(cbm * den, num)
+            throughput = _volume(spec.get("throughput_cbm") or 0, "throughput_cbm")
+            handling = tariff["handling"]
+            if handling and spec.get("loose") and "handling_loose" in VAS_TARIFFS[tariff["vas"]]:
+                handling = "handling_loose"
+            vas = spec.get("vas") or {}
+            if not isinstance(vas, dict):
+                raise ValueError("vas must be an object of {service: qty}")
+            group = VAS_TARIFFS[tariff["vas"]]
+            extras = []
+            for name, qty in vas.items():
+                if name not in group:
+                    raise ValueError(f"{name} is not a {tariff['vas']} VAS (one of {', '.join(group)})")
+                extras.append((name, _volume(qty, name)))
+            days = storage_days(spec)
+        except (TypeError, ValueError) as e:
+            errors[i] = str(e)
+            continue
+        cols["index"].append(i)
+        cols["tariff"].append(key)
+        cols["cbm"].append(cbm)
+        cols["sqm"].append(sqm)
+        cols["days"].append(days)
+        cols["throughput"].append(throughput)
+        cols["handling"].append(handling)
+        cols["vas"].append(extras)
+    return cols, errors
+
+def price_storage_batch(specs):
+    """
+    Prices many storage scenarios at once, one column at a time: storage
+    (volume × rate × period), throughput handling, then the extra VAS.
+    Returns one result dict per scenario (in order), or {"error": ...}.
+    """
+    cols, errors = storage_columns(specs)
+    tariffs = [STORAGE_TARIFFS[k] for k in cols["tariff"]]
+
+    storage = [
+        round_fils(t["fils"] * cbm * days, VOLUME_DEN) if t["per"] == "cbm_day"
+        else round_fils(t["fils"] * sqm * days, VOLUME_DEN * DAYS_PER["year"])
+        for t, cbm, sqm, days in zip(tariffs, cols["cbm"], cols["sqm"], cols["days"])
+    ]
+    handling = [
+        round_fils(VAS_TARIFFS[t["vas"]][h]["fils"] * thr * days, VOLUME_DEN * HANDLING_DAYS) if h and thr else 0
+        for t, h, thr, days in zip(tariffs, cols["handling"], cols["throughput"], cols["days"])
+    ]
+    extras = [
+        [(name, qty, round_fils(VAS_TARIFFS[t["vas"]][name]["fils"] * qty, VOLUME_DEN)) for name, qty in vas]
+        for t, vas in zip(tariffs, cols["vas"])
+    ]
+    totals = [s + h + sum(a for _, _, a in ex) for s, h, ex in zip(storage, handling, extras)]
+
+    results = [{"error": errors[i]} if i in errors else None for i in range(len(specs))]
+    for n, i in enumerate(cols["index"]):
+        t, group = tariffs[n], VAS_TARIFFS[tariffs[n]["vas"]]
+        vas = []
+        if handling[n]:
+            h = group[cols["handling"][n]]
+            vas.append({"service": h["label"], "qty": cols["throughput"][n] * cols["days"][n] / (VOLUME_DEN * HANDLING_DAYS),
+                        "per": h["per"], "unit": money_fils(h["fils"]), "amount": money_fils(handling[n])})
+        for name, qty, amount in extras[n]:
+            v = group[name]
+            vas.append({"service": v["label"], "qty": qty / VOLUME_DEN, "per": v["per"],
+                        "unit": money_fils(v["fils"]), "amount": money_fils(amount)})
+        results[i] = {
+            "tariff": cols["tariff"][n], "label": t["label"], "vas_tariff": t["vas"],
+            "cbm": cols["cbm"][n] / VOLUME_DEN, "sqm": cols["sqm"][n] / VOLUME_DEN, "days": cols["days"][n],
+            "rate": money_fils(t["fils"]), "per": t["per"],
+            "storage": money_fils(storage[n]),
+            "vas": vas,
+            "total": money_fils(totals[n]),
+        }
+    return results
+
+def price_storage(spec):
+    """One storage scenario; see storage_columns for the fields."""
+    return price_storage_batch([spec])[0]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Tariff text for the chat knowledge base: replies write {storage:standard_ac}
+# or {vas:standard.pallet_loading} and get "2.5 AED/CBM/day" / "12 AED/pallet",
+# so the rates are only kept in the tables above.
+# ──────────────────────────────────────────────────────────────────────────────
+TARIFF_UNITS = {"cbm_day": "CBM/day", "sqm_year": "SQM/year", "cbm": "CBM"}
+_TARIFF_REF = re.compile(r"\{(storage|vas):([a-z0-9_.]+)\}")
+
+def aed_text(fils):
+    """3000.00 -> "3,000", 2.50 -> "2.5"."""
+    return f"{fils / 100:,.2f}".rstrip("0").rstrip(".")
+
+def tariff_text(kind, name):
+    if kind == "storage":
+        t = STORAGE_TARIFFS.get(name)
+    else:
+        group, _, service = name.partition(".")
+        t = VAS_TARIFFS.get(group, {}).get(service)
+    if t is None:
+        raise ValueError(f"unknown {kind} tariff {name!r}")
+    # daily rates read as "2.0 AED/CBM/day"
+    amount = f"{t['fils'] / 100:.1f}" if t["per"] == "cbm_day" and t["fils"] % 10 == 0 else aed_text(t["fils"])
+    return f"{amount} AED/{TARIFF_UNITS.get(t['per'], t['per'])}"
+
+def fill_tariffs(text):
+    """Replaces the {storage:...} / {vas:...} references in a reply."""
+    return _TARIFF_REF.sub(lambda m: tariff_text(m.group(1), m.group(2)), text)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Chat: "storage quote 500 cbm chemical ac for 6 months, 200 cbm throughput"
+# ──────────────────────────────────────────────────────────────────────────────
+# indoor types first: "mussafah" / "kizad" alone is where, not what, is stored
+CHAT_TARIFF_PATTERNS = [
+    (r"\bchemical\s*non\s*ac\b|\bnon\s*ac\s*chemical", "chemical_non_ac"),
+    (r"\bchemical", "chemical_ac"),
+    (r"\bopen\s*shed\b", "open_shed"),
+    (r"\bnon\s*ac\b", "standard_non_ac"),
+    (r"\bac\b|\bstandard\b|\bair\s*condition", "standard_ac"),
+    (r"\bopen\s*yard\b.*\bkizad\b|\bkizad\b.*\bopen\s*yard\b", "open_yard_kizad"),
+    (r"\bopen\s*yard\b.*\bmussafah\b|\bmussafah\b.*\bopen\s*yard\b", "open_yard_mussafah"),
+]
+_NUM = r"(\d+(?:\.\d+)?)"
+
+def parse_storage_request(message):
+    """
+    Returns a storage scenario (see storage_columns) from a chat message, or
+    None unless it names a stored volume (CBM / SQM) and a storage type.
+    """
+    tariff = next((key for rx, key in CHAT_TARIFF_PATTERNS if re.search(rx, message)), None)
+    if tariff is None:
+        return None
+    spec = {"tariff": tariff}
+    throughput = re.search(r"throughput\D{0,12}" + _NUM + r"\s*cbm|" + _NUM + r"\s*cbm\s*(?:of\s*)?throughput",
+                           message)
+    rest = message
+    if throughput:
+        spec["throughput_cbm"] = throughput.group(1) or throughput.group(2)
+        rest = message[:throughput.start()] + " " + message[throughput.end():]
+    volume = re.search(_NUM + r"\s*(cbm|sqm|sq\.?\s?m|m2)\b", rest)
+    if not volume:
+        return None
+    spec["cbm" if volume.group(2) == "cbm" else "sqm"] = volume.group(1)
+    period = re.search(_NUM + r"\s*(day|week|month|year)s?\b", rest)
+    if period:
+        spec[period.group(2) + "s"] = period.group(1)
+    if re.search(r"\bloose\b", message):
+        spec["loose"] = True
+    return spec
+
+def chat_storage_quote(message, params):
+    spec = parse_storage_request(message)
+    if spec is None:
+        return None
+    q = price_storage(spec)
+    if "error" in q:
+        return None
+    lines = [params["header"].format(**q)]
+    volume = f"{q['cbm']:g} CBM" if q["per"] == "cbm_day" else f"{q['sqm']:g} SQM"
+    per = "CBM/day" if q["per"] == "cbm_day" else "SQM/year"
+    lines.append(params["storage"].format(**{**q, "volume": volume, "per": per}))
+    if "sqm" in spec and q["per"] == "cbm_day":
+        lines.append(params["converted"].format(**q))
+    for v in q["vas"]:
+        lines.append(params["vas"].format(**{**v, "qty": f"{v['qty']:g}"}))
+    lines.append(params["total"].format(**q))
+    lines.append("")
+    lines.append(params["footer"])
+    return "\n".join(lines)
@@ -0,0 +1,9 @@
+import os, sys, tempfile
+
+# keep the shared rate table and the SQLite stores out of instance/
+_tmp = tempfile.mkdtemp(prefix="dsv-tests-")
+os.environ.setdefault("SHARED_RATES_FILE", os.path.join(_tmp, "rates.bin"))
+os.environ.setdefault("QUOTE_JOBS_DB", os.path.join(_tmp, "quote_jobs.sqlite3"))
+os.environ.setdefault("QUOTE_ARCHIVE_DB", os.path.join(_tmp, "quote_archive.sqlite3"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+import pytest
+from flask import Flask
+
+import admission
+
+@pytest.fixture(autouse=True)
+def fresh_buckets(monkeypatch):
+    monkeypatch.setattr(admission, "_buckets", OrderedDict())
+    monkeypatch.setattr(admission, "_session_buckets", {})
+    monkeypatch.setitem(admission.ADMISSION_GATES, "chat", dict(admission.ADMISSION_GATES["chat"], rate=0.001, burst=2))
+
+def key_for(ip, session):
+    with Flask(__name__).test_request_context("/chat", method="POST", json={"session": session},
+                                              environ_base={"REMOTE_ADDR": ip}):
+        return admission.client_key()
+
+def test_key_always_includes_ip():
+    assert key_for("10.0.0.1", "token-aaaa") == ("10.0.0.1", "token-aaaa")
+    assert key_for("10.0.0.1", "bad") == ("10.0.0.1", None)
+
+def test_rotating_sessions_are_limited():
+    served = sum(admission.take_token("chat", key_for("10.0.0.1", f"token-{i:04d}")) == 0 for i in range(200))
+    assert served == admission.ADMISSION_SESSIONS_PER_IP + 2     # one call per session, then the IP burst
+    assert admission.take_token("chat", key_for("10.0.0.2", "token-0000")) == 0
+
+def test_session_buckets_bounded_per_ip(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_BUCKETS_MAX", 20)
+    victim = key_for("10.0.0.9", "token-real")
+    admission.take_token("chat", victim)
+    for i in range(500):
+        admission.take_token("chat", key_for("10.0.0.1", f"token-{i:04d}"))
+    assert len(admission._buckets) == admission.ADMISSION_SESSIONS_PER_IP + 2
+    assert ("chat",) + victim in admission._buckets
+
+def client_ip_app():
+    app = Flask(__name__)
+    app.register_blueprint(admission.admission_bp)
+    app.add_url_rule("/ip", "ip", lambda: admission.client_key()[0])
+    return app.test_client()
+
+def test_client_ip_behind_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(admission, "TRUSTED_PROXY_HOPS", 1)
+    r = client_ip_app().get("/ip", headers={"X-Forwarded-For": "6.6.6.6, 10.1.2.3"},
+                            environ_base={"REMOTE_ADDR": "10.0.0.1"})
+    assert r.text == "10.1.2.3"        # the router's entry, not the client-supplied one
+
+def test_forwarded_header_ignored_without_proxy(monkeypatch):
+    monkeypatch.setattr(admission, "TRUSTED_PROXY_HOPS", 0)
+    r = client_ip_app().get("/ip", headers={"X-Forwarded-For": "6.6.6.6"}, environ_base={"REMOTE_ADDR": "10.0.0.1"})
+    assert r.text == "10.0.0.1"
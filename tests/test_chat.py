@@ -0,0 +1,137 @@
+import json, os
+from collections import OrderedDict
+
+import pytest
+
+import admission
+import chat
+import chat_app
+import distances
+import spelling
+
+def reply(message):
+    intent, prepared, _ = chat.match_chat(chat.CHAT_KB, message)
+    return intent, json.loads(prepared["body"])["reply"]
+
+def test_price_from_pickup():
+    parsed = chat.parse_price_request("price 2 flatbed mussafah to ruwais back load")
+    assert parsed["pickups"] == ["mussafah"]
+    assert parsed["destinations"] == ["Ruwais"]
+    assert parsed["trucks"] == [("flatbed", 2)]
+    assert parsed["trip"] == "back_load"
+
+def test_price_origin_not_a_pickup():
+    parsed = chat.parse_price_request("price flatbed from ruwais to mussafah")
+    assert parsed["pickups"] == [] and parsed["origin"] == "Ruwais"
+    intent, text = reply("price flatbed from ruwais to mussafah")
+    assert intent == "instant_price"
+    assert "not from Ruwais" in text and "AED" not in text
+
+def test_price_emirate_names():
+    assert chat.parse_price_request("how much is a flatbed to dubai")["destinations"] == ["Dubai - City Limits"]
+    intent, text = reply("flatbed rate mussafah to abu dhabi")
+    assert intent == "instant_price" and "Mussafah → Abu Dhabi City Limits" in text
+
+def test_price_ambiguous_destination_asks():
+    intent, text = reply("price 2 flatbed to rak")
+    assert intent == "instant_price"
+    assert "Ras Al Khaimah - Hamra" in text and "Ras Al Khaimah Al Ghail" in text and "AED" not in text
+
+@pytest.mark.parametrize("word", ["tender", "booking", "careers", "manager", "border"])
+def test_english_words_are_not_corrected(word):
+    assert spelling.correct_text(chat.CHAT_KB["speller"], f"{word} for 2 trucks") == f"{word} for 2 trucks"
+    assert reply(word)[0] == "fallback"
+
+def test_short_words_get_one_edit():
+    index = spelling.build_spell_index({"transport": 1, "storage": 1})
+    assert spelling.correct_word(index, "stoarge") == "storage"      # 7 letters, one edit
+    assert spelling.correct_word(index, "stoargg") == "stoargg"      # 7 letters, two edits
+    assert spelling.correct_word(index, "tarnsprt") == "transport"   # 8 letters, two edits
+
+def test_typo_still_matches_rule():
+    assert reply("wharehouse storage")[0] == "storage_type_prompt"
+
+def test_correction_without_rule_match_is_dropped(monkeypatch):
+    seen = []
+    monkeypatch.setattr(chat, "retrieve_rule", lambda kb, message: seen.append(message))
+    assert reply("shippment qwerty")[0] == "fallback"
+    assert seen == [chat.normalize_message(chat.CHAT_KB, "shippment qwerty")]
+
+@pytest.mark.parametrize("message", ["what is the weather today", "cancel my booking"])
+def test_unrelated_short_query_falls_back(message):
+    assert reply(message)[0] == "fallback"
+
+def test_retrieval_ignores_reply_text():
+    retrieval = chat.CHAT_KB["retrieval"]
+    assert "great" not in retrieval["index"]["postings"]      # only in the how_are_you reply
+    assert reply("insurance for cargo")[0] == "insurance_quotation"
+
+def test_price_skips_lane_to_its_own_pickup():
+    intent, text = reply("how much for 2 flatbed to abu dhabi airport")
+    assert intent == "instant_price"
+    assert "Mussafah → AUH Airport" in text and "AUH Airport → AUH Airport" not in text
+
+def test_price_area_from_distance_data():
+    parsed = chat.parse_price_request("price flatbed mussafah to uaq")
+    assert parsed["destinations"] == distances.DISTANCES["areas"]["uaq"]
+
+def test_unknown_rate_area_fails_loudly(tmp_path, monkeypatch):
+    with open(os.path.join(chat.BASE_DIR, distances.DISTANCE_FILE), encoding="utf-8") as f:
+        spec = json.load(f)
+    spec["rate_areas"]["dubai"] = ["Dubai City Centre"]
+    path = tmp_path / "distance_matrix.json"
+    path.write_text(json.dumps(spec), encoding="utf-8")
+    monkeypatch.setattr(distances, "DISTANCE_FILE", str(path))
+    with pytest.raises(ValueError, match="Dubai City Centre"):
+        distances.load_distance_matrix()
+
+def test_word_list_skips_license_header():
+    words = spelling.load_word_list(os.path.join(chat.BASE_DIR, "english_words.txt"))
+    assert "tender" in words and not any(w.startswith("#") or " " in w for w in words)
+
+# ── bulk classification ──────────────────────────────────────────────────────
+CLASSIFY_IN = [
+    b'{"id": "a", "message": "hi"}\n',
+    b"\n",
+    b'"what are your storage rates"\n',
+    b"{not json\n",
+    b'{"id": 7, "message": 3}\n',
+    b"[1, 2]\n",
+    b'"\xff\xfe"\n',
+    b'{"id": "m", "message": "Hi team,\\nplease quote 2 flatbed mussafah to ruwais"}\n',
+]
+
+def classified(lines, **kw):
+    return [json.loads(out) for out in chat.classify_lines(chat.CHAT_KB, lines, **kw)]
+
+def test_classify_lines():
+    out = classified(CLASSIFY_IN)
+    assert [o.get("id") for o in out] == ["a", 2, None, 7, 5, None, "m"]
+    assert out[0]["intent"] == "greeting" and out[0]["reply"] == reply("hi")[1]
+    assert out[1]["intent"] == "storage_type_prompt"
+    assert out[2] == {"line": 3, "error": "invalid JSON"}
+    assert out[3] == {"id": 7, "error": "message must be a string"}
+    assert out[4] == {"id": 5, "error": "message must be a string"}
+    assert out[5] == {"line": 6, "error": "invalid JSON"}
+    assert out[6]["intent"] == "instant_price"       # the greeting line does not hide the request
+
+def test_classify_lines_without_replies_and_limit():
+    out = classified(CLASSIFY_IN, replies=False, limit=2)
+    assert out == [{"id": "a", "intent": "greeting"}, {"id": 2, "intent": "storage_type_prompt"},
+                   {"line": 3, "error": "at most 2 lines per request"}]
+
+def test_classify_endpoint_streams_jsonl(monkeypatch):
+    monkeypatch.setattr(admission, "_buckets", OrderedDict())
+    monkeypatch.setattr(admission, "_session_buckets", {})
+    with chat_app.app.test_client().post("/chat/classify?replies=0", data=b"".join(CLASSIFY_IN)) as r:
+        assert r.status_code == 200 and r.mimetype == "application/x-ndjson"
+        body = r.data
+    assert body.endswith(b"\n") and [json.loads(ln) for ln in body.splitlines()] == \
+        classified(CLASSIFY_IN, replies=False)
+
+def test_classify_command(tmp_path):
+    src, dst = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    src.write_bytes(b"".join(CLASSIFY_IN))
+    result = chat_app.app.test_cli_runner().invoke(args=["chat", "classify", str(src), "-o", str(dst), "-w", "1"])
+    assert result.exit_code == 0, result.output
+    assert [json.loads(ln) for ln in dst.read_bytes().splitlines()] == classified(CLASSIFY_IN)
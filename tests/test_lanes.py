@@ -0,0 +1,13 @@
+import pytest
+
+import app as web
+
+@pytest.mark.parametrize("k", ["abc", "0", "101", "-3", "2.5", "%C2%B2", "%D9%A3", "9" * 40])
+def test_top_destinations_bad_k(k):
+    r = web.app.test_client().get(f"/lanes/top_destinations?pickup=mussafah&truck=flatbed&k={k}")
+    assert r.status_code == 400
+    assert r.get_json()["error"] == f"k must be an integer from 1 to {web.LANES_TOP_MAX}"
+
+def test_top_destinations_k():
+    r = web.app.test_client().get("/lanes/top_destinations?pickup=mussafah&truck=flatbed&k=3")
+    assert r.status_code == 200 and len(r.get_json()["destinations"]) == 3
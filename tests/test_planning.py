@@ -0,0 +1,116 @@
+import pytest
+
+import app as web
+import planning
+
+@pytest.fixture
+def client():
+    return web.app.test_client()
+
+def test_truck_mix_unknown_destination_is_400(client):
+    r = client.post("/truck_mix", json={"origin": "Mussafah", "destination": "Nowhere", "tons": 30})
+    assert r.status_code == 400
+    assert r.get_json()["error"] == "unknown destination 'Nowhere'"
+
+def test_truck_mix_origin_must_be_pickup(client):
+    r = client.post("/truck_mix", json={"origin": "Ruwais", "destination": "Mussafah", "tons": 30})
+    assert r.status_code == 400 and "origin must be one of" in r.get_json()["error"]
+
+def test_truck_mix_known_lane(client):
+    r = client.post("/truck_mix", json={"origin": "Mussafah", "destination": "ruwais", "tons": 30})
+    assert r.status_code == 200 and r.get_json()["mixes"]
+
+RUN = {"origin": "Mussafah", "trucks": [{"truck": "Flatbed", "qty": 1}]}
+
+def test_route_with_unrated_drop_has_no_total(client):
+    r = client.post("/route_plan", json={**RUN, "drops": ["Ruwais", "Madinat Zayed", "Liwa"]})
+    body = r.get_json()
+    assert r.status_code == 200
+    assert body["priced"] is False and body["total"] is None
+    assert body["unpriced"] == ["Madinat Zayed"]
+    assert all(row["amount"] == "" for row in body["rows"])
+
+def test_route_with_unrated_drop_is_not_rendered(client):
+    r = client.post("/route_plan?format=docx", json={**RUN, "drops": ["Ruwais", "Madinat Zayed"]})
+    assert r.status_code == 400 and r.get_json()["unpriced"] == ["Madinat Zayed"]
+
+def test_route_single_drop_priced_on_its_lane(client):
+    body = client.post("/route_plan", json={**RUN, "drops": ["Ruwais"]}).get_json()
+    assert body["priced"] is True and body["unpriced"] == [] and body["total"] == "2,100.00"
+
+def test_multi_drop_run_is_not_priced(client):
+    body = client.post("/route_plan", json={**RUN, "drops": ["Ruwais", "Liwa"]}).get_json()
+    assert body["priced"] is False and body["total"] is None and body["multi_drop"] is True
+    assert body["unpriced"] == [] and all(row["amount"] == "" for row in body["rows"])
+    assert all(lane["unit"] for lane in body["drops"][0]["lanes"])      # listed for the quotation
+    r = client.post("/route_plan?format=docx", json={**RUN, "drops": ["Ruwais", "Liwa"]})
+    assert r.status_code == 400 and "multi-drop" in r.get_json()["error"]
+
+def test_route_emirate_drop_uses_rate_area(client):
+    body = client.post("/route_plan", json={**RUN, "drops": ["Dubai"]}).get_json()
+    assert body["priced"] is True
+    assert body["drops"][0]["lanes"][0]["destination"] == "Dubai - City Limits"
+    body = client.post("/route_plan", json={**RUN, "drops": ["Ras Al Khaimah"]}).get_json()
+    assert body["priced"] is False and body["unpriced"] == ["Ras Al Khaimah"]
+
+def test_route_origin_alias_is_priceable(client):
+    body = client.post("/route_plan", json={**RUN, "origin": "airport", "drops": ["Ruwais"]}).get_json()
+    assert "error" not in body and body["route"].startswith("AUH Airport")
+
+@pytest.mark.parametrize("qty", ["abc", "²", -1, 0, 2.5, True, 1000])
+def test_route_bad_qty_is_400(client, qty):
+    r = client.post("/route_plan", json={**RUN, "trucks": [{"truck": "Flatbed", "qty": qty}], "drops": ["Ruwais"]})
+    assert r.status_code == 400
+    assert r.get_json()["error"] == "qty must be an integer from 1 to 100"
+
+@pytest.mark.parametrize("field, value", [("tons", "inf"), ("cbm", "nan"), ("pallets", "-inf"), ("tons", 1e9),
+                                          ("tons", -1), ("tons", [3]), ("top_k", "inf")])
+def test_truck_mix_bad_number_is_400(client, field, value):
+    body = {"origin": "Mussafah", "destination": "Ruwais", "tons": 30, field: value}
+    r = client.post("/truck_mix", json=body)
+    assert r.status_code == 400
+    assert r.get_json()["error"] == f"bad number: {field} must be a number from 0 to 10000"
+
+# ── load plans ───────────────────────────────────────────────────────────────
+def vehicles(manifest, spaces=None):
+    return {p["space"]: p["vehicles"] for p in planning.plan_load(manifest, spaces)}
+
+def test_load_plan_pallet_counts():
+    counts = vehicles([{"pallet": "standard", "qty": 48, "weight": 500}])
+    assert counts["flatbed"] == 2            # 24 standard pallets per deck
+    assert counts["curtain trailer"] == 2
+    assert counts["7tpickup"] == 6           # 8 per deck
+    assert counts["container_20ft"] == 6     # 9 per floor
+    assert vehicles([{"pallet": "euro", "qty": 33}], ["container_20ft", "flatbed"]) == \
+        {"container_20ft": 3, "flatbed": 2}  # 11 and 30 euro pallets
+
+def test_load_plan_payload_bound():
+    plan, = planning.plan_load([{"pallet": "standard", "qty": 48, "weight": 1000}], ["flatbed"])
+    assert plan["vehicles"] == 3 and plan["weight_kg"] == 48000
+    assert plan["lines"][0]["per_vehicle"] == 22      # 22,000 kg payload, not 24 slots
+
+def test_load_plan_stacks_and_misfits():
+    manifest = [{"sku": "box", "qty": 100, "length": 1, "width": 1, "height": 1, "weight": 10},
+                {"sku": "pipe", "qty": 4, "length": 7, "width": 0.5, "height": 0.5, "weight": 100}]
+    plans = {p["space"]: p for p in planning.plan_load(manifest, ["flatbed", "7tpickup"])}
+    assert plans["flatbed"]["lines"][0]["layers"] == 2
+    assert plans["flatbed"]["vehicles"] == 3
+    assert plans["7tpickup"]["fits"] is False and plans["7tpickup"]["vehicles"] is None
+    assert plans["7tpickup"]["does_not_fit"] == ["pipe"]
+
+def test_load_plan_route_with_lane(client):
+    r = client.post("/load_plan", json={"manifest": [{"pallet": "standard", "qty": 48}],
+                                        "spaces": ["flatbed"], "origin": "Mussafah", "destination": "Ruwais"})
+    body = r.get_json()
+    assert r.status_code == 200 and body["plans"][0]["vehicles"] == 2
+    assert body["quote_form"]["truck_type[]"] == ["Flatbed"]
+    assert body["quote_form"]["truck_qty[]"] == ["2"]
+
+@pytest.mark.parametrize("spec, error", [
+    ({"manifest": []}, "manifest must be a non-empty list"),
+    ({"manifest": [{"pallet": "pallet", "qty": 1}]}, "bad manifest: line 1: pallet must be one of standard, euro"),
+    ({"manifest": [{"pallet": "euro", "qty": 1}], "spaces": ["boat"]}, "spaces must be a list of"),
+])
+def test_load_plan_bad_request(client, spec, error):
+    r = client.post("/load_plan", json=spec)
+    assert r.status_code == 400 and r.get_json()["error"].startswith(error)
@@ -0,0 +1,104 @@
+import os
+from collections import OrderedDict
+from decimal import Decimal
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import pricing
+from pricing import money, money_fils, round_fils, to_fils
+
+# the Decimal path money handling used before amounts were integer fils
+OLD_MULT = {"one_way": Decimal("1.00"), "back_load": Decimal("1.60")}
+
+def old_amount(fils, trip, qty=1):
+    return Decimal(fils) / 100 * OLD_MULT[trip] * qty
+
+@pytest.mark.parametrize("value, fils", [
+    ("1234.56", 123456), ("12.345", 1235), ("0.005", 1), ("0.004", 0), ("2.675", 268),
+    (2.675, 268), (1.005, 101), ("-12.345", -1235), (1800, 180000), (1800.0, 180000), ("n/a", 0),
+])
+def test_to_fils_rounds_half_up(value, fils):
+    assert to_fils(value) == fils
+    if fils:
+        assert money_fils(fils) == money(value)
+
+@pytest.mark.parametrize("v, den", [(5, 10), (-5, 10), (15, 10), (149, 100), (150, 100), (-150, 100), (250, 100)])
+def test_round_fils_matches_money(v, den):
+    assert money_fils(round_fils(v, den)) == money(Decimal(v) / den / 100)
+
+def test_lane_prices_match_decimal_money():
+    lanes = [(lane, cell) for lane, cell in pricing.RATES.items() if isinstance(lane, tuple)]
+    assert lanes
+    for _, cell in lanes:
+        for fils in cell.values():
+            for trip in ("one_way", "back_load"):
+                for qty in (1, 3, 7):
+                    unit = fils * pricing.trip_mult(trip)
+                    assert money_fils(round_fils(unit)) == money(old_amount(fils, trip))
+                    assert money_fils(round_fils(unit * qty)) == money(old_amount(fils, trip, qty))
+
+def test_quote_total_matches_decimal_money():
+    form = MultiDict([("origin", "Mussafah"), ("destination", "Ruwais"), ("trip_type", "one_way"),
+                      ("truck_type[]", "Flatbed"), ("truck_qty[]", "3"), ("trip_kind[]", "back_load"),
+                      ("truck_type[]", "7TPickup"), ("truck_qty[]", "2"), ("trip_kind[]", "one_way")])
+    quote = pricing.price_transport_quote(form)
+    cell = pricing.RATES[("mussafah", "ruwais")]
+    total = old_amount(cell["flatbed"], "back_load", 3) + old_amount(cell["7tpickup"], "one_way", 2)
+    assert money_fils(quote["grand_total"]) == money(total)
+    assert quote["rows"][0][1:] == (f"AED {money(old_amount(cell['flatbed'], 'back_load'))}",
+                                    f"AED {money(old_amount(cell['flatbed'], 'back_load', 3))}")
+
+# ── customer rate cards ──────────────────────────────────────────────────────
+def write_card(path, pickup, cells):
+    """A one-pickup card in the rate sheet layout: {(destination, truck label): AED}."""
+    from openpyxl import Workbook
+    wb = Workbook()
+    ws = wb.active
+    ws.cell(row=1, column=2, value=pickup)
+    trucks = sorted({t for _, t in cells})
+    dests = sorted({d for d, _ in cells})
+    for c, truck in enumerate(trucks, 2):
+        ws.cell(row=2, column=c, value=truck)
+    for r, dest in enumerate(dests, 3):
+        ws.cell(row=r, column=1, value=dest)
+        for c, truck in enumerate(trucks, 2):
+            ws.cell(row=r, column=c, value=cells.get((dest, truck)))
+    wb.save(path)
+
+@pytest.fixture
+def cards(monkeypatch, tmp_path):
+    monkeypatch.setattr(pricing, "CUSTOMER_RATES_DIR", str(tmp_path))
+    monkeypatch.setattr(pricing, "_customer_cards", OrderedDict())
+    return tmp_path
+
+def test_customer_card_overrides_only_its_lanes(cards):
+    write_card(cards / "acme.xlsx", "MUSSAFAH", {("Ruwais", "Flatbed"): 1234.5, ("Ruwais", "7TPickup"): None})
+    base = pricing.RATES[("mussafah", "ruwais")]
+    assert pricing.customer_overrides("acme") == {("mussafah", "ruwais", "flatbed"): 123450}
+    assert pricing.lookup_rate("Mussafah", "Ruwais", "Flatbed", "general", "acme") == 123450
+    assert pricing.lookup_rate("Mussafah", "Ruwais", "7TPickup", "general", "acme") == base["7tpickup"]
+    assert pricing.lookup_rate("Mussafah", "Ruwais", "Flatbed", "general") == base["flatbed"]
+    assert pricing.unit_price("Mussafah", "Ruwais", "flatbed", "back_load", customer="acme") == (123450 * 160, "ok")
+
+def test_customer_quote_uses_card(cards):
+    write_card(cards / "acme.xlsx", "MUSSAFAH", {("Ruwais", "Flatbed"): 1000})
+    form = MultiDict([("origin", "Mussafah"), ("destination", "Ruwais"), ("trip_type", "one_way"),
+                      ("customer", " ACME "), ("truck_type[]", "Flatbed"), ("truck_qty[]", "2"),
+                      ("truck_type[]", "7TPickup"), ("truck_qty[]", "1")])
+    quote = pricing.price_transport_quote(form)
+    assert quote["customer"] == "acme"
+    assert quote["grand_total"] == 2 * 100000 + pricing.RATES[("mussafah", "ruwais")]["7tpickup"]
+
+def test_customer_card_reloads_on_change(cards):
+    path = cards / "acme.xlsx"
+    write_card(path, "MUSSAFAH", {("Ruwais", "Flatbed"): 1000})
+    assert pricing.lookup_rate("Mussafah", "Ruwais", "Flatbed", "general", "acme") == 100000
+    write_card(path, "MUSSAFAH", {("Ruwais", "Flatbed"): 1100})
+    os.utime(path, (1, 1))
+    assert pricing.lookup_rate("Mussafah", "Ruwais", "Flatbed", "general", "acme") == 110000
+
+def test_unknown_customer_has_no_card(cards):
+    assert pricing.customer_overrides("nobody") is None
+    assert pricing.customer_overrides("") == {}
+    assert pricing.customer_key("../etc/passwd") == ""
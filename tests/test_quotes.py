@@ -0,0 +1,143 @@
+import threading, time
+from collections import OrderedDict
+
+import pytest
+
+import app as web
+
+@pytest.fixture
+def client():
+    return web.app.test_client()
+
+@pytest.mark.parametrize("query", ["min_total=abc", "max_total=abc", "min_total=nan", "max_total=1,000"])
+def test_search_bad_total_is_400(client, query):
+    r = client.get(f"/quotes?{query}")
+    assert r.status_code == 400
+    assert "must be an amount in AED" in r.get_json()["error"]
+
+def test_search_total_filters(client):
+    assert client.get("/quotes?min_total=1000.50&max_total=").status_code == 200
+
+@pytest.mark.parametrize("query", ["min_total=1e30", "max_total=1e20", "min_total=-1e20"])
+def test_search_total_out_of_range_is_400(client, query):
+    r = client.get(f"/quotes?{query}")
+    assert r.status_code == 400
+    assert r.get_json()["error"] == f"bad search parameter: {query.split('=')[0]} must be an amount in AED"
+
+@pytest.mark.parametrize("query, message", [
+    ("page=abc", "page must be an integer from 1 to 100000"),
+    ("page=99999999999999999999", "page must be an integer from 1 to 100000"),
+    ("per_page=%C2%B2", "per_page must be an integer from 1 to 100"),
+    ("date_from=2026-13-01", "date_from must be a date as YYYY-MM-DD"),
+    ("date_to=yesterday", "date_to must be a date as YYYY-MM-DD"),
+])
+def test_search_bad_parameter_message(client, query, message):
+    r = client.get(f"/quotes?{query}")
+    assert r.status_code == 400
+    assert r.get_json()["error"] == f"bad search parameter: {message}"
+
+# ── duplicate submissions / idempotency keys ─────────────────────────────────
+
+FORM = {"origin": "Mussafah", "destination": "Ruwais", "trip_type": "one_way",
+        "truck_type[]": "Flatbed", "truck_qty[]": "1"}
+
+@pytest.fixture
+def fake_build(monkeypatch, tmp_path):
+    """build_transport_quote replaced by a counter that blocks until release is set."""
+    template = tmp_path / "TransportQuotation.docx"
+    template.write_bytes(b"docx")
+    monkeypatch.setattr(web, "QUOTE_TEMPLATE", str(template))
+    monkeypatch.setattr(web, "_quote_inflight", OrderedDict())
+    state = {"calls": 0, "started": threading.Event(), "release": threading.Event(), "fail": False}
+    def build(form):
+        state["calls"] += 1
+        state["started"].set()
+        state["release"].wait(5)
+        if state["fail"]:
+            raise RuntimeError("render failed")
+        return b"docx", "quote.docx", 1000 + state["calls"]
+    monkeypatch.setattr(web, "build_transport_quote", build)
+    return state
+
+def post_quote(form, out):
+    with web.app.test_client().post("/generate_transport", data=form) as r:
+        out.append((r.status_code, r.headers.get("X-Quote-Id")))
+
+def test_concurrent_duplicates_share_one_build(fake_build):
+    out = []
+    first = threading.Thread(target=post_quote, args=(FORM, out))
+    first.start()
+    assert fake_build["started"].wait(5)
+    second = threading.Thread(target=post_quote, args=(dict(FORM, destination=" Ruwais "), out))
+    second.start()
+    fake_build["release"].set()
+    first.join(5), second.join(5)
+    assert fake_build["calls"] == 1
+    assert out == [(200, "1001"), (200, "1001")]
+
+def test_idempotency_key_reused_for_other_form_conflicts(fake_build, client):
+    fake_build["release"].set()
+    with client.post("/generate_transport", data=dict(FORM, idempotency_key="abc")) as r:
+        assert r.status_code == 200
+    with client.post("/generate_transport", data=dict(FORM, destination="Dubai", idempotency_key="abc")) as r:
+        assert r.status_code == 422
+    assert fake_build["calls"] == 1
+
+def test_failed_build_releases_key(fake_build, client):
+    fake_build["release"].set()
+    fake_build["fail"] = True
+    with client.post("/generate_transport", data=FORM) as r:
+        assert r.status_code == 500
+    assert not web._quote_inflight
+    fake_build["fail"] = False
+    with client.post("/generate_transport", data=FORM) as r:
+        assert (r.status_code, r.headers["X-Quote-Id"]) == (200, "1002")
+
+def test_duplicate_of_hung_build_gives_up(fake_build, monkeypatch):
+    monkeypatch.setattr(web, "QUOTE_DEDUP_WAIT", 0.05)
+    out = []
+    first = threading.Thread(target=post_quote, args=(FORM, out))
+    first.start()
+    assert fake_build["started"].wait(5)
+    with web.app.test_client().post("/generate_transport", data=FORM) as r:
+        assert r.status_code == 503 and r.headers["Retry-After"]
+    fake_build["release"].set()
+    first.join(5)
+    assert out == [(200, "1001")] and fake_build["calls"] == 1
+
+# ── quote jobs ───────────────────────────────────────────────────────────────
+
+def wait_for_job(client, url, status="done"):
+    for _ in range(200):
+        body = client.get(url).get_json()
+        if body["status"] == status:
+            return body
+        time.sleep(0.02)
+    raise AssertionError(f"job still {body['status']}")
+
+def test_quote_job_lifecycle(fake_build, client):
+    with client.post("/quote_jobs", data=FORM) as r:
+        assert r.status_code == 202
+        job = r.get_json()
+    assert job["status"] == "queued" and r.headers["Location"] == job["status_url"]
+    assert fake_build["started"].wait(5)
+    assert client.get(job["status_url"]).get_json()["status"] == "running"
+    with client.get(job["download_url"]) as r:
+        assert r.status_code == 409
+    fake_build["release"].set()
+    done = wait_for_job(client, job["status_url"])
+    assert done["quote_id"] == 1001 and done["download_url"] == job["download_url"]
+    with client.get(job["download_url"]) as r:
+        assert r.status_code == 200 and r.data == b"docx"
+        assert "quote.docx" in r.headers["Content-Disposition"]
+
+def test_failed_quote_job_reports_error(fake_build, client):
+    fake_build["fail"] = True
+    fake_build["release"].set()
+    with client.post("/quote_jobs", data=FORM) as r:
+        job = r.get_json()
+    assert wait_for_job(client, job["status_url"], "failed")["error"] == "render failed"
+
+def test_unknown_quote_job_is_404(client):
+    assert client.get("/quote_jobs/nope").status_code == 404
+    assert client.get("/quote_jobs/nope/download").status_code == 404
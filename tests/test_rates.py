@@ -0,0 +1,91 @@
+import copy, os
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import lanes
+import pricing
+
+@pytest.fixture
+def table_file(tmp_path, monkeypatch):
+    """A private shared-table file; the attached table is restored afterwards."""
+    path = str(tmp_path / "rates.bin")
+    monkeypatch.setattr(pricing, "SHARED_RATES_FILE", path)
+    saved = pricing._shared_rates, pricing._shared_rates_checked, list(pricing._shared_rates_retired)
+    yield path
+    mine = [pricing._shared_rates] + [t for _, t in pricing._shared_rates_retired]
+    pricing._shared_rates, pricing._shared_rates_checked, pricing._shared_rates_retired[:] = saved
+    for table in mine:
+        if table is not None and table is not saved[0] and not table["mm"].closed:
+            pricing.close_shared_rates(table)
+
+def recheck():
+    pricing._shared_rates_checked = 0.0
+    return pricing.shared_rates()
+
+def test_import_does_not_publish():
+    assert not os.path.exists(os.environ["SHARED_RATES_FILE"])
+
+def test_new_generation_updates_metadata_and_index(table_file):
+    first = pricing.init_shared_rates(table_file)
+    assert first["generation"] == 1
+    version = pricing.current_rate_index()["version"]
+    assert pricing.cicpa_required_for("Ruwais") and not pricing.cicpa_required_for("Sharjah")
+    assert "Flatbed" in pricing.trucks_allowed_for("Ruwais")
+
+    rates = copy.deepcopy(pricing.RATES)
+    rates[("mussafah", "ruwais")]["flatbed"] = 999900
+    rates["__cicpa__"] = set(rates["__cicpa__"]) | {"sharjah"}
+    rates["__cicpa_trucks__"] = [t for t in rates["__cicpa_trucks__"] if t != "Flatbed"]
+    assert pricing.publish_shared_rates(rates, table_file) == 2
+    assert recheck()["generation"] == 2
+
+    assert pricing.lookup_rate("Mussafah", "Ruwais", "Flatbed", "general") == 999900
+    assert pricing.cicpa_required_for("Sharjah")
+    assert "Flatbed" not in pricing.trucks_allowed_for("Ruwais")
+    assert pricing.unit_price("Mussafah", "Ruwais", "flatbed", "one_way") == (None, "not_available")
+    index = pricing.current_rate_index()
+    assert index["version"] != version and b"999900" in index["body"]
+    assert lanes.price_spread("Ruwais", "flatbed") == {}
+    assert lanes.price_spread("Ruwais", "hazmatfb")["HazmatFB"]["pickups"] == 3
+
+def test_archived_version_follows_generation(table_file):
+    pricing.init_shared_rates(table_file)
+    rates = copy.deepcopy(pricing.RATES)
+    rates[("mussafah", "ruwais")]["flatbed"] = 123400
+    pricing.publish_shared_rates(rates, table_file)
+    recheck()
+    form = MultiDict({"origin": "Mussafah", "destination": "Ruwais", "truck_type[]": "Flatbed", "truck_qty[]": "1"})
+    quote = pricing.price_transport_quote(form)
+    assert quote["grand_total"] == 123400
+    assert quote["rate_version"] == pricing.current_rate_index()["version"]
+
+def test_superseded_mapping_is_closed(table_file, monkeypatch):
+    first = pricing.init_shared_rates(table_file)
+    rates = copy.deepcopy(pricing.RATES)
+    rates[("mussafah", "ruwais")]["flatbed"] += 100
+    pricing.publish_shared_rates(rates, table_file)
+    recheck()
+    assert not first["mm"].closed          # kept for lookups still using it
+    monkeypatch.setattr(pricing, "SHARED_RATES_RETIRE_SECONDS", 0.0)
+    recheck()
+    assert first["mm"].closed and not pricing._shared_rates_retired
+
+def test_republishing_same_rates_keeps_generation(table_file):
+    pricing.init_shared_rates(table_file)
+    assert pricing.publish_shared_rates(pricing.RATES, table_file) == 1
+
+def test_stale_table_is_not_attached(table_file):
+    rates = copy.deepcopy(pricing.RATES)
+    rates[("mussafah", "ruwais")]["flatbed"] = 111100
+    pricing.publish_shared_rates(rates, table_file)
+    os.utime(table_file, (0, 0))             # older than the workbook
+    assert pricing.load_rates()              # read from the sheet instead
+    assert recheck() is None
+    assert pricing.lookup_rate("Mussafah", "Ruwais", "Flatbed", "general") == \
+        pricing.RATES[("mussafah", "ruwais")]["flatbed"] != 111100
+
+def test_fresh_table_is_attached(table_file):
+    pricing.publish_shared_rates(pricing.RATES, table_file)
+    assert pricing.load_rates() == {}
+    assert recheck()["generation"] == 1
@@ -0,0 +1,39 @@
+import json, os
+
+import pytest
+
+import chat
+import storage
+
+@pytest.mark.parametrize("message, tariff, total", [
+    ("500 cbm standard ac storage in mussafah for 3 months", "standard_ac", "112,500.00"),
+    ("1000 cbm non ac warehouse mussafah 2 months", "standard_non_ac", "120,000.00"),
+    ("200 cbm chemical storage kizad 1 month", "chemical_ac", "21,000.00"),
+    ("500 sqm open yard mussafah for 1 year", "open_yard_mussafah", "80,000.00"),
+    ("500 sqm kizad open yard 1 year", "open_yard_kizad", "62,500.00"),
+])
+def test_chat_storage_tariff(message, tariff, total):
+    spec = storage.parse_storage_request(message)
+    assert spec["tariff"] == tariff
+    assert storage.price_storage(spec)["total"] == total
+
+def test_location_alone_is_not_a_tariff():
+    assert storage.parse_storage_request("500 cbm storage in mussafah") is None
+
+def test_kb_replies_follow_tariff_table(monkeypatch):
+    with open(os.path.join(chat.BASE_DIR, chat.CHAT_KB_FILE), encoding="utf-8") as f:
+        spec = json.load(f)
+    monkeypatch.setitem(storage.STORAGE_TARIFFS, "standard_ac", dict(storage.STORAGE_TARIFFS["standard_ac"], fils=275))
+    group = dict(storage.VAS_TARIFFS["standard"])
+    group["pallet_loading"] = dict(group["pallet_loading"], fils=1350)
+    monkeypatch.setitem(storage.VAS_TARIFFS, "standard", group)
+    replies = {r["id"]: json.loads(r["reply"]["body"])["reply"]
+               for r in chat.compile_chat_knowledge(spec)["rules"] if r["reply"]}
+    assert replies["standard_ac_rate"] == "Standard AC storage is 2.75 AED/CBM/day. Standard VAS applies."
+    assert "- Non-AC: 2.0 AED/CBM/day" in replies["storage_rates_all"]
+    assert "- Pallet Loading: 13.5 AED/pallet" in replies["standard_vas"]
+    assert "- Inventory Count: 3,000 AED/event" in replies["standard_vas"]
+
+def test_unknown_tariff_reference_fails():
+    with pytest.raises(ValueError):
+        storage.fill_tariffs("{storage:open_yard_dubai}")